@@ -1,20 +1,33 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, FileResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateMany
 import os
 import logging
 from pathlib import Path
+from urllib.parse import urlparse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 import uuid
 from datetime import datetime
 import aiohttp
 import asyncio
 import json
-import websockets
+import itertools
+import orjson
+import multiprocessing
+import shutil
+import mimetypes
+import hashlib
 import base64
+import math
+import time
+import websockets
+from collections import OrderedDict, deque
 from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -24,17 +37,228 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Indexes the API's queries rely on, created at startup; set INDEX_REPAIR_DRIFT
+# to rebuild indexes whose definition differs instead of only reporting them
+DATABASE_INDEXES = {
+    "video_generations": [
+        {"name": "id_unique", "keys": [("id", 1)], "unique": True},
+        {"name": "created_at_id_desc", "keys": [("created_at", -1), ("id", -1)]},
+        {"name": "status_created_at_id", "keys": [("status", 1), ("created_at", -1), ("id", -1)]},
+        {"name": "comfyui_prompt_id_sparse", "keys": [("comfyui_prompt_id", 1)], "sparse": True},
+        {"name": "workflow_hash_status_created_at", "keys": [("workflow_hash", 1), ("status", 1), ("created_at", -1)], "sparse": True},
+        {"name": "batch_id_sparse", "keys": [("batch_id", 1)], "sparse": True},
+        {"name": "parent_id_sparse", "keys": [("parent_id", 1)], "sparse": True},
+    ],
+    "status_checks": [
+        {"name": "id_unique", "keys": [("id", 1)], "unique": True},
+        {"name": "timestamp_desc", "keys": [("timestamp", -1)]},
+    ],
+    "generation_sweeps": [
+        {"name": "id_unique", "keys": [("id", 1)], "unique": True},
+    ],
+}
+INDEX_REPAIR_DRIFT = os.environ.get('INDEX_REPAIR_DRIFT', 'false').lower() == 'true'
+
 # ComfyUI Configuration
+def websocket_url(base_url: str) -> str:
+    return base_url.replace('http://', 'ws://').replace('https://', 'wss://') + '/ws'
+
+def persistent_client_id(path: Path) -> str:
+    """Client id saved by an earlier run, or a new one saved for the next"""
+    try:
+        client_id = path.read_text().strip()
+        if client_id:
+            return client_id
+    except OSError:
+        pass
+    client_id = str(uuid.uuid4())
+    try:
+        path.write_text(client_id)
+    except OSError:
+        pass  # Prompts queued before a restart are then settled from /history
+    return client_id
+
 COMFYUI_BASE_URL = os.environ.get('COMFYUI_URL', 'http://127.0.0.1:8188')
-COMFYUI_WS_URL = os.environ.get('COMFYUI_WS_URL', 'ws://127.0.0.1:8188/ws')
+# Defaults to the /ws endpoint of COMFYUI_URL
+COMFYUI_WS_URL = os.environ.get('COMFYUI_WS_URL') or websocket_url(COMFYUI_BASE_URL)
+# ComfyUI only sends execution events to the client that queued the prompt,
+# so every prompt is queued under the id our event listener subscribes with;
+# it is kept in COMFYUI_CLIENT_ID_FILE so prompts survive a restart
+COMFYUI_CLIENT_ID_FILE = Path(os.environ.get('COMFYUI_CLIENT_ID_FILE', str(ROOT_DIR / '.comfyui_client_id')))
+COMFYUI_CLIENT_ID = os.environ.get('COMFYUI_CLIENT_ID') or persistent_client_id(COMFYUI_CLIENT_ID_FILE)
+# Additional ComfyUI instances as a comma separated list of base URLs;
+# COMFYUI_URL is always the primary backend
+COMFYUI_EXTRA_URLS = [url.strip() for url in os.environ.get('COMFYUI_URLS', '').split(',') if url.strip()]
+
+# ComfyUI HTTP connection pool
+COMFYUI_POOL_LIMIT = int(os.environ.get('COMFYUI_POOL_LIMIT', '100'))
+COMFYUI_POOL_LIMIT_PER_HOST = int(os.environ.get('COMFYUI_POOL_LIMIT_PER_HOST', '20'))
+COMFYUI_DNS_CACHE_TTL = int(os.environ.get('COMFYUI_DNS_CACHE_TTL', '300'))
+COMFYUI_KEEPALIVE_TIMEOUT = float(os.environ.get('COMFYUI_KEEPALIVE_TIMEOUT', '30'))
+
+# Per-operation timeouts for ComfyUI calls
+COMFYUI_TIMEOUTS = {
+    "default": aiohttp.ClientTimeout(total=30, connect=5),
+    "object_info": aiohttp.ClientTimeout(total=10, connect=5),
+    "prompt": aiohttp.ClientTimeout(total=30, connect=5),
+    "queue": aiohttp.ClientTimeout(total=5, connect=3),
+    "view": aiohttp.ClientTimeout(total=120, connect=5, sock_read=30),
+    "system_stats": aiohttp.ClientTimeout(total=5, connect=3),
+}
+
+# ComfyUI model catalog (/object_info) cache
+COMFYUI_OBJECT_INFO_TTL = float(os.environ.get('COMFYUI_OBJECT_INFO_TTL', '300'))
+COMFYUI_OBJECT_INFO_REFRESH_AHEAD = float(os.environ.get('COMFYUI_OBJECT_INFO_REFRESH_AHEAD', '0.8'))
+COMFYUI_OBJECT_INFO_ERROR_RETRY = float(os.environ.get('COMFYUI_OBJECT_INFO_ERROR_RETRY', '5'))
+
+# ComfyUI WebSocket event listener
+COMFYUI_WS_RECONNECT_MIN = float(os.environ.get('COMFYUI_WS_RECONNECT_MIN', '1'))
+COMFYUI_WS_RECONNECT_MAX = float(os.environ.get('COMFYUI_WS_RECONNECT_MAX', '30'))
+COMFYUI_WS_STATE_LIMIT = int(os.environ.get('COMFYUI_WS_STATE_LIMIT', '1000'))
+
+# ComfyUI queue snapshot shared by status lookups
+COMFYUI_QUEUE_SNAPSHOT_TTL = float(os.environ.get('COMFYUI_QUEUE_SNAPSHOT_TTL', '1.0'))
+
+# ComfyUI circuit breaker and background health probe
+COMFYUI_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('COMFYUI_BREAKER_FAILURE_THRESHOLD', '3'))
+COMFYUI_BREAKER_RESET_TIMEOUT = float(os.environ.get('COMFYUI_BREAKER_RESET_TIMEOUT', '15'))
+COMFYUI_HEALTH_INTERVAL = float(os.environ.get('COMFYUI_HEALTH_INTERVAL', '5'))
+
+# Frame proxy to ComfyUI /view
+FRAME_CHUNK_SIZE = int(os.environ.get('FRAME_CHUNK_SIZE', str(64 * 1024)))
+FRAME_REQUEST_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+FRAME_RESPONSE_HEADERS = (
+    "content-type", "content-length", "content-range", "accept-ranges",
+    "etag", "last-modified", "cache-control", "content-disposition"
+)
+
+# Workflow templates
+WORKFLOW_TEMPLATES_DIR = Path(os.environ.get('WORKFLOW_TEMPLATES_DIR', str(ROOT_DIR / 'workflows')))
+
+# Dispatch queue: prompts kept inside each ComfyUI instance, and how long model
+# affinity may pass over older jobs (in measured model swaps, capped in seconds)
+DISPATCH_WINDOW = int(os.environ.get('DISPATCH_WINDOW', '2'))
+DISPATCH_SWAP_BUDGET = float(os.environ.get('DISPATCH_SWAP_BUDGET', '3'))
+DISPATCH_MAX_WAIT = float(os.environ.get('DISPATCH_MAX_WAIT', '60'))
+DISPATCH_MAX_SKIPS = int(os.environ.get('DISPATCH_MAX_SKIPS', '8'))
+DISPATCH_DEFAULT_SWAP_SECONDS = float(os.environ.get('DISPATCH_DEFAULT_SWAP_SECONDS', '10'))
+DISPATCH_RECONCILE_INTERVAL = float(os.environ.get('DISPATCH_RECONCILE_INTERVAL', '10'))
+
+# Admission control: queued jobs accepted per priority lane and the Retry-After
+# derived from how fast the queue drained over the recent window
+DISPATCH_MAX_BACKLOG = int(os.environ.get('DISPATCH_MAX_BACKLOG', '200'))
+DISPATCH_DRAIN_WINDOW = float(os.environ.get('DISPATCH_DRAIN_WINDOW', '300'))
+DISPATCH_RETRY_AFTER_DEFAULT = int(os.environ.get('DISPATCH_RETRY_AFTER_DEFAULT', '30'))
+DISPATCH_RETRY_AFTER_MAX = int(os.environ.get('DISPATCH_RETRY_AFTER_MAX', '600'))
+DISPATCH_PRIORITIES = ("high", "normal", "bulk")
+
+# Bulk submissions; a batch or sweep is admitted as a whole, so neither may
+# be larger than the dispatch backlog
+BATCH_MAX_SIZE = min(int(os.environ.get('BATCH_MAX_SIZE', '200')), DISPATCH_MAX_BACKLOG)
+SWEEP_MAX_CELLS = min(int(os.environ.get('SWEEP_MAX_CELLS', '200')), DISPATCH_MAX_BACKLOG)
+
+# Runtime estimator: render seconds are fitted per checkpoint against
+# width x height x frames x steps and refitted in the background
+ESTIMATOR_REFIT_INTERVAL = float(os.environ.get('ESTIMATOR_REFIT_INTERVAL', '30'))
+ESTIMATOR_HISTORY = int(os.environ.get('ESTIMATOR_HISTORY', '2000'))
+ESTIMATOR_DECAY = float(os.environ.get('ESTIMATOR_DECAY', '0.995'))  # weight kept by older completions per new one
+ESTIMATOR_MIN_SAMPLES = int(os.environ.get('ESTIMATOR_MIN_SAMPLES', '3'))
+
+# Long renders are split into prompts of at most this many frames
+SEGMENT_FRAMES = int(os.environ.get('SEGMENT_FRAMES', '32'))
+
+# VRAM model: bytes per latent pixel for sampling (per batch entry, fp16, as ComfyUI
+# sizes it) and VAE decode (per image), plus weights and headroom in GiB
+VRAM_SAMPLING_BYTES_PER_LATENT = int(os.environ.get('VRAM_SAMPLING_BYTES_PER_LATENT', '20972'))
+VRAM_DECODE_BYTES_PER_LATENT = int(os.environ.get('VRAM_DECODE_BYTES_PER_LATENT', '278784'))
+VRAM_MODEL_GB = float(os.environ.get('VRAM_MODEL_GB', '2.5'))
+VRAM_LORA_GB = float(os.environ.get('VRAM_LORA_GB', '0.2'))
+VRAM_CHECKPOINT_GB = json.loads(os.environ.get('VRAM_CHECKPOINT_GB', '{}'))  # checkpoint -> weights GiB
+VRAM_RESERVE_GB = float(os.environ.get('VRAM_RESERVE_GB', '0.5'))
+
+# Local storage for generated outputs
+ARTIFACTS_DIR = Path(os.environ.get('ARTIFACTS_DIR', str(ROOT_DIR / 'artifacts')))
+HARVEST_CONCURRENCY = int(os.environ.get('HARVEST_CONCURRENCY', '4'))
+HARVEST_RESUME_LIMIT = int(os.environ.get('HARVEST_RESUME_LIMIT', '100'))
+ARTIFACT_STORE_MAX_BYTES = int(os.environ.get('ARTIFACT_STORE_MAX_BYTES', str(10 * 1024 ** 3)))
+
+# Frame-to-video assembly
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+VIDEO_FORMAT = os.environ.get('VIDEO_FORMAT', 'mp4')  # mp4 or webm
+VIDEO_FPS = int(os.environ.get('VIDEO_FPS', '8'))
+VIDEO_ENCODE_WORKERS = int(os.environ.get('VIDEO_ENCODE_WORKERS', '2'))
+
+# History previews
+PREVIEW_POSTER_SIZE = int(os.environ.get('PREVIEW_POSTER_SIZE', '256'))
+PREVIEW_SPRITE_FRAMES = int(os.environ.get('PREVIEW_SPRITE_FRAMES', '8'))
+PREVIEW_SPRITE_TILE = int(os.environ.get('PREVIEW_SPRITE_TILE', '128'))
+
+# Generation history pages
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '50'))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', '200'))
+
+# Client progress streams (SSE and /api/ws)
+STREAM_REPLAY_SIZE = int(os.environ.get('STREAM_REPLAY_SIZE', '16'))
+STREAM_REPLAY_LIMIT = int(os.environ.get('STREAM_REPLAY_LIMIT', '1000'))
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', '256'))
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get('STREAM_HEARTBEAT_INTERVAL', '15'))
+
+http_session: Optional[aiohttp.ClientSession] = None
+
+def create_http_session() -> aiohttp.ClientSession:
+    """Create the pooled HTTP client shared by every ComfyUI call"""
+    connector = aiohttp.TCPConnector(
+        limit=COMFYUI_POOL_LIMIT,
+        limit_per_host=COMFYUI_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=COMFYUI_DNS_CACHE_TTL,
+        keepalive_timeout=COMFYUI_KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=COMFYUI_TIMEOUTS["default"])
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP client, creating it if lifespan has not run yet"""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = create_http_session()
+    return http_session
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global http_session
     # Startup
     logging.info("Starting ComfyUI Video Generator backend...")
+    http_session = create_http_session()
+    for limit in ('BATCH_MAX_SIZE', 'SWEEP_MAX_CELLS'):
+        if int(os.environ.get(limit, '0')) > DISPATCH_MAX_BACKLOG:
+            logger.warning(f"{limit} is capped at DISPATCH_MAX_BACKLOG ({DISPATCH_MAX_BACKLOG})")
+    await index_manager.ensure()
+    workflow_templates.load()
+    backend_registry.start()
+    runtime_estimator.start()
+    dispatch_queue.start()
+    await artifact_store.load()
+    # Work interrupted by the last shutdown; the API still starts if MongoDB is down
+    for name, resume in (
+        ("harvests", output_harvester.resume),
+        ("segmented renders", segment_renders.resume),
+        ("dispatch queue", dispatch_queue.resume)
+    ):
+        try:
+            await resume()
+        except Exception as e:
+            logger.error(f"Error resuming {name}: {e}")
     yield
     # Shutdown
     logging.info("Shutting down ComfyUI Video Generator backend...")
+    await dispatch_queue.stop()
+    await runtime_estimator.stop()
+    await backend_registry.stop()
+    await segment_renders.stop()
+    await output_harvester.stop()
+    video_assembler.shutdown()
+    if http_session is not None:
+        await http_session.close()
+        http_session = None
     client.close()
 
 # Create the main app with lifespan
@@ -43,6 +267,96 @@ app = FastAPI(lifespan=lifespan)
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+class IndexManager:
+    """Creates the expected MongoDB indexes and reports drift from them"""
+
+    def __init__(self, specs: Dict[str, List[Dict[str, Any]]]):
+        self.specs = specs
+        self.report: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def normalize_keys(keys) -> List[tuple]:
+        return [(field, int(direction)) for field, direction in keys]
+
+    @classmethod
+    def differences(cls, spec: Dict[str, Any], info: Dict[str, Any]) -> List[str]:
+        """Ways an existing index differs from its spec"""
+        differences = []
+        if cls.normalize_keys(info["key"]) != cls.normalize_keys(spec["keys"]):
+            differences.append(f"keys are {cls.normalize_keys(info['key'])}, expected {spec['keys']}")
+        for option in ("unique", "sparse"):
+            if bool(info.get(option, False)) != spec.get(option, False):
+                differences.append(f"{option} is {bool(info.get(option, False))}, expected {spec.get(option, False)}")
+        return differences
+
+    async def ensure(self):
+        """Create missing indexes and, with INDEX_REPAIR_DRIFT, rebuild drifted ones"""
+        for collection, specs in self.specs.items():
+            try:
+                existing = await db[collection].index_information()
+            except Exception as e:
+                logger.error(f"Error reading indexes of {collection}: {e}")
+                continue
+            by_keys = {tuple(self.normalize_keys(info["key"])): name for name, info in existing.items()}
+            for spec in specs:
+                info = existing.get(spec["name"])
+                # An index on the same keys under another name blocks creating this one
+                conflict = by_keys.get(tuple(self.normalize_keys(spec["keys"])))
+                drifted = (info is not None and self.differences(spec, info)) or (info is None and conflict is not None)
+                if drifted and not INDEX_REPAIR_DRIFT:
+                    continue
+                try:
+                    if drifted:
+                        await db[collection].drop_index(spec["name"] if info is not None else conflict)
+                    if info is None or drifted:
+                        await db[collection].create_index(
+                            spec["keys"], name=spec["name"],
+                            unique=spec.get("unique", False), sparse=spec.get("sparse", False)
+                        )
+                except Exception as e:
+                    logger.error(f"Error creating index {spec['name']} on {collection}: {e}")
+        try:
+            report = await self.verify()
+        except Exception as e:
+            logger.error(f"Error verifying indexes: {e}")
+            return
+        if not report["in_sync"]:
+            logger.warning(f"MongoDB indexes differ from the expected set: {report['collections']}")
+
+    async def verify(self) -> Dict[str, Any]:
+        """Compare the indexes in MongoDB against the specs"""
+        collections = {}
+        for collection, specs in self.specs.items():
+            existing = await db[collection].index_information()
+            by_keys = {tuple(self.normalize_keys(info["key"])): name for name, info in existing.items()}
+            missing, mismatched = [], []
+            for spec in specs:
+                info = existing.get(spec["name"])
+                if info is not None:
+                    differences = self.differences(spec, info)
+                    if differences:
+                        mismatched.append({"name": spec["name"], "differences": differences})
+                    continue
+                conflict = by_keys.get(tuple(self.normalize_keys(spec["keys"])))
+                if conflict is not None:
+                    mismatched.append({"name": spec["name"], "differences": [f"exists as {conflict}"]})
+                else:
+                    missing.append(spec["name"])
+            expected = {spec["name"] for spec in specs}
+            collections[collection] = {
+                "missing": missing,
+                "mismatched": mismatched,
+                "unmanaged": [name for name in existing if name != "_id_" and name not in expected]
+            }
+        self.report = {
+            "checked_at": datetime.utcnow().isoformat(),
+            "in_sync": not any(entry["missing"] or entry["mismatched"] for entry in collections.values()),
+            "collections": collections
+        }
+        return self.report
+
+index_manager = IndexManager(DATABASE_INDEXES)
+
 # Define Models
 class StatusCheck(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -60,7 +374,31 @@ class VideoGenerationRequest(BaseModel):
     height: int = 512
     frames: int = 16
     duration_type: str = "short"  # short, medium, long
+    workflow_template: str = "video"
+    # Sampling overrides; unset values keep the template's defaults
+    negative_prompt: Optional[str] = None
+    seed: Optional[int] = None
+    steps: Optional[int] = None
+    cfg: Optional[float] = None
+    sampler: Optional[str] = None
+    scheduler: Optional[str] = None
+    lora_strength: float = 1.0
+    use_cache: bool = True  # reuse the result of an identical completed workflow
+    priority: Optional[str] = None  # high, normal, bulk; batches default to bulk, the rest to normal
     
+class BatchGenerationRequest(BaseModel):
+    requests: List[VideoGenerationRequest]
+
+# Request fields a sweep may vary
+SWEEP_AXES = (
+    "prompt", "negative_prompt", "checkpoint", "lora", "lora_strength", "seed",
+    "steps", "cfg", "sampler", "scheduler", "width", "height", "frames"
+)
+
+class SweepRequest(BaseModel):
+    base: VideoGenerationRequest
+    axes: Dict[str, List[Any]]  # field -> values, expanded as a cartesian product
+
 class VideoGeneration(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     prompt: str
@@ -70,248 +408,2502 @@ class VideoGeneration(BaseModel):
     height: int
     frames: int
     duration_type: str
-    status: str = "pending"  # pending, processing, completed, failed
+    workflow_template: str = "video"
+    negative_prompt: Optional[str] = None
+    seed: Optional[int] = None
+    steps: Optional[int] = None
+    cfg: Optional[float] = None
+    sampler: Optional[str] = None
+    scheduler: Optional[str] = None
+    lora_strength: float = 1.0
+    workflow_hash: Optional[str] = None
+    # Kept so work requeued after a restart is shared only if the request allowed it
+    use_cache: bool = True
+    cached_from: Optional[str] = None
+    # Segmented renders: the parent holds segment_count, each segment its parent_id and index
+    parent_id: Optional[str] = None
+    segment_index: Optional[int] = None
+    segment_count: Optional[int] = None
+    batch_id: Optional[str] = None
+    priority: str = "normal"
+    estimated_seconds: Optional[float] = None
+    render_seconds: Optional[float] = None
+    # Live fields of the status response
+    queue_position: Optional[int] = None
+    eta_seconds: Optional[float] = None
+    status: str = "pending"  # pending, queued, processing, completed, failed, cancelled
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
     result_path: Optional[str] = None
     error_message: Optional[str] = None
     comfyui_prompt_id: Optional[str] = None
+    comfyui_backend: Optional[str] = None
+    progress: Optional[float] = None
+    outputs: Optional[List[Dict[str, Any]]] = None
+    manifest: Optional[List[Dict[str, Any]]] = None
+    harvest_status: Optional[str] = None  # pending, running, done, failed
+    video: Optional[Dict[str, Any]] = None
+    previews: Optional[Dict[str, Any]] = None
+
+DEFAULT_SEED = 156680208700286
+
+# Built-in video workflow; slots map request parameters to [node_id, input_name]
+BUILTIN_WORKFLOW_TEMPLATE = {
+    "workflow": {
+        "3": {
+            "inputs": {
+                "seed": DEFAULT_SEED,
+                "steps": 20,
+                "cfg": 8.0,
+                "sampler_name": "euler",
+                "scheduler": "normal",
+                "denoise": 1.0,
+                "model": ["4", 0],
+                "positive": ["6", 0],
+                "negative": ["7", 0],
+                "latent_image": ["5", 0]
+            },
+            "class_type": "KSampler",
+            "_meta": {
+                "title": "KSampler"
+            }
+        },
+        "4": {
+            "inputs": {
+                "ckpt_name": ""
+            },
+            "class_type": "CheckpointLoaderSimple",
+            "_meta": {
+                "title": "Load Checkpoint"
+            }
+        },
+        "5": {
+            "inputs": {
+                "width": 512,
+                "height": 512,
+                "batch_size": 16
+            },
+            "class_type": "EmptyLatentImage",
+            "_meta": {
+                "title": "Empty Latent Image"
+            }
+        },
+        "6": {
+            "inputs": {
+                "text": "",
+                "clip": ["4", 1]
+            },
+            "class_type": "CLIPTextEncode",
+            "_meta": {
+                "title": "CLIP Text Encode (Prompt)"
+            }
+        },
+        "7": {
+            "inputs": {
+                "text": "blurry, low quality, distorted",
+                "clip": ["4", 1]
+            },
+            "class_type": "CLIPTextEncode",
+            "_meta": {
+                "title": "CLIP Text Encode (Negative)"
+            }
+        },
+        "8": {
+            "inputs": {
+                "samples": ["3", 0],
+                "vae": ["4", 2]
+            },
+            "class_type": "VAEDecode",
+            "_meta": {
+                "title": "VAE Decode"
+            }
+        },
+        "9": {
+            "inputs": {
+                "filename_prefix": "ComfyUI_video",
+                "images": ["8", 0]
+            },
+            "class_type": "SaveImage",
+            "_meta": {
+                "title": "Save Image"
+            }
+        }
+    },
+    "slots": {
+        "prompt": [["6", "text"]],
+        "negative_prompt": [["7", "text"]],
+        "checkpoint": [["4", "ckpt_name"]],
+        "width": [["5", "width"]],
+        "height": [["5", "height"]],
+        "frames": [["5", "batch_size"]],
+        "seed": [["3", "seed"]],
+        "steps": [["3", "steps"]],
+        "cfg": [["3", "cfg"]],
+        "sampler": [["3", "sampler_name"]],
+        "scheduler": [["3", "scheduler"]]
+    },
+    # LoRA loaders are chained between these sources and targets
+    "lora": {
+        "model": ["4", 0],
+        "clip": ["4", 1],
+        "model_targets": [["3", "model"]],
+        "clip_targets": [["6", "clip"], ["7", "clip"]]
+    }
+}
+
+class WorkflowTemplate:
+    """A ComfyUI API workflow compiled so only its parameter slots are filled per request.
+
+    Nodes without slots are encoded to JSON once at load time and spliced
+    into every payload; nodes with slots are copied and encoded per render.
+    """
+
+    def __init__(self, name: str, workflow: Dict[str, Any], slots: Dict[str, List[List[str]]],
+                 lora: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.slots = slots
+        self.lora = lora
+        self.defaults = {
+            param: workflow[paths[0][0]]["inputs"].get(paths[0][1])
+            for param, paths in slots.items() if paths and paths[0][0] in workflow
+        }
+        
+        targets: Dict[str, List[tuple]] = {}
+        for param, paths in slots.items():
+            for node_id, input_name in paths:
+                targets.setdefault(node_id, []).append((param, input_name))
+        if lora:
+            for node_id, input_name in lora["model_targets"]:
+                targets.setdefault(node_id, []).append(("_lora_model", input_name))
+            for node_id, input_name in lora["clip_targets"]:
+                targets.setdefault(node_id, []).append(("_lora_clip", input_name))
+        missing = [node_id for node_id in targets if node_id not in workflow]
+        if missing:
+            raise ValueError(f"Slots reference unknown nodes: {', '.join(missing)}")
+        
+        self._dynamic = {node_id: (workflow[node_id], targets[node_id]) for node_id in targets}
+        self._static = [
+            orjson.dumps(node_id) + b":" + orjson.dumps(node)
+            for node_id, node in workflow.items() if node_id not in targets
+        ]
+        self._next_node_id = max((int(node_id) for node_id in workflow if node_id.isdigit()), default=0) + 1
+
+    def render(self, params: Dict[str, Any], loras: Optional[List[tuple]] = None) -> bytes:
+        """Encode the workflow with the given slot values; None keeps the template default"""
+        values = {param: value for param, value in params.items() if value is not None}
+        fragments = list(self._static)
+        
+        if loras and not self.lora:
+            raise ValueError(f"Workflow template '{self.name}' does not support LoRA")
+        if self.lora:
+            model, clip = self.lora["model"], self.lora["clip"]
+            for index, (lora_name, strength) in enumerate(loras or []):
+                node_id = str(self._next_node_id + index)
+                node = {
+                    "inputs": {
+                        "lora_name": lora_name,
+                        "strength_model": strength,
+                        "strength_clip": strength,
+                        "model": model,
+                        "clip": clip
+                    },
+                    "class_type": "LoraLoader",
+                    "_meta": {
+                        "title": "Load LoRA"
+                    }
+                }
+                fragments.append(orjson.dumps(node_id) + b":" + orjson.dumps(node))
+                model, clip = [node_id, 0], [node_id, 1]
+            values["_lora_model"], values["_lora_clip"] = model, clip
+        
+        for node_id, (node, targets) in self._dynamic.items():
+            inputs = dict(node["inputs"])
+            for param, input_name in targets:
+                if param in values:
+                    inputs[input_name] = values[param]
+            fragments.append(orjson.dumps(node_id) + b":" + orjson.dumps({**node, "inputs": inputs}))
+        return b"{" + b",".join(fragments) + b"}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "slots": sorted(self.slots), "lora": self.lora is not None}
+
+class WorkflowTemplateRegistry:
+    """Built-in and user-supplied workflow templates, compiled once at startup"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._templates: Dict[str, WorkflowTemplate] = {}
+
+    def load(self):
+        """(Re)load the built-in template and every *.json file in the templates directory"""
+        templates = {"video": WorkflowTemplate("video", **BUILTIN_WORKFLOW_TEMPLATE)}
+        if self.directory.is_dir():
+            for path in sorted(self.directory.glob("*.json")):
+                try:
+                    spec = orjson.loads(path.read_bytes())
+                    templates[path.stem] = WorkflowTemplate(path.stem, spec["workflow"], spec.get("slots", {}), spec.get("lora"))
+                except Exception as e:
+                    logger.error(f"Error loading workflow template {path.name}: {e}")
+        self._templates = templates
+        logger.info(f"Loaded workflow templates: {', '.join(templates)}")
+
+    def get(self, name: str) -> Optional[WorkflowTemplate]:
+        return self._templates.get(name)
+
+    def all(self) -> List[WorkflowTemplate]:
+        return list(self._templates.values())
+
+workflow_templates = WorkflowTemplateRegistry(WORKFLOW_TEMPLATES_DIR)
+
+def workflow_hash(workflow) -> str:
+    """SHA-256 of a workflow graph with sorted keys and without UI-only _meta"""
+    if isinstance(workflow, bytes):
+        workflow = orjson.loads(workflow)
+    graph = {
+        node_id: {key: value for key, value in node.items() if key != "_meta"}
+        for node_id, node in workflow.items()
+    }
+    return hashlib.sha256(orjson.dumps(graph, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+GIB = 1024 ** 3
+
+def model_vram_bytes(checkpoint: str, lora: Optional[str] = None) -> int:
+    """VRAM taken by a checkpoint's weights and its LoRA"""
+    weights = VRAM_CHECKPOINT_GB.get(checkpoint, VRAM_MODEL_GB) + (VRAM_LORA_GB if lora else 0.0)
+    return int(weights * GIB)
+
+def vram_required(gen, frames: Optional[int] = None) -> int:
+    """Estimated peak VRAM of a prompt: model weights and latents plus the larger of
+    sampling, which scales with the frame batch and runs a negative pass for CFG,
+    and VAE decode, which ComfyUI batches down to one image when memory is short.
+    """
+    frames = frames if frames is not None else ComfyUIService.frame_count(gen)
+    latent_pixels = (gen.width // 8) * (gen.height // 8)
+    latents = 4 * 4 * latent_pixels * frames
+    sampling = 2 * frames * latent_pixels * VRAM_SAMPLING_BYTES_PER_LATENT
+    decode = latent_pixels * VRAM_DECODE_BYTES_PER_LATENT
+    return model_vram_bytes(gen.checkpoint, gen.lora) + latents + max(sampling, decode)
+
+def render_work(gen) -> float:
+    """Megapixel-steps a generation renders, the feature its runtime is estimated from"""
+    template = workflow_templates.get(gen.workflow_template)
+    steps = gen.steps or (template.defaults.get("steps") if template else None) or 20
+    return gen.width * gen.height * ComfyUIService.frame_count(gen) * steps / 1e6
 
 class ComfyUIService:
     @staticmethod
-    async def get_available_checkpoints():
-        """Get available checkpoints from ComfyUI"""
+    async def get_object_info(backend: Optional["ComfyUIBackend"] = None):
+        """Fetch the full node schema from ComfyUI /object_info"""
+        backend = backend or backend_registry.primary
+        if not backend.breaker.allow():
+            return None
         try:
-            timeout = aiohttp.ClientTimeout(total=10)  # 10 second timeout
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(f"{COMFYUI_BASE_URL}/object_info") as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        checkpoints = []
-                        
-                        # Extract checkpoint models
-                        if "CheckpointLoaderSimple" in data:
-                            checkpoint_loader = data["CheckpointLoaderSimple"]
-                            if "input" in checkpoint_loader and "required" in checkpoint_loader["input"]:
-                                if "ckpt_name" in checkpoint_loader["input"]["required"]:
-                                    checkpoints = checkpoint_loader["input"]["required"]["ckpt_name"][0]
-                        
-                        return checkpoints
-                    else:
-                        logger.error(f"ComfyUI returned status {response.status}")
-                        return []
+            session = get_http_session()
+            async with session.get(f"{backend.base_url}/object_info", timeout=COMFYUI_TIMEOUTS["object_info"]) as response:
+                backend.breaker.record_response(response.status)
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    logger.error(f"ComfyUI returned status {response.status}")
+                    return None
         except asyncio.TimeoutError:
+            backend.breaker.record_failure()
             logger.error("Timeout connecting to ComfyUI")
-            return []
+            return None
         except aiohttp.ClientConnectorError as e:
+            backend.breaker.record_failure()
             logger.error(f"Connection error to ComfyUI: {e}")
-            return []
+            return None
         except Exception as e:
-            logger.error(f"Error getting checkpoints: {e}")
-            return []
+            backend.breaker.record_error(e)
+            logger.error(f"Error getting object info: {e}")
+            return None
+
+    @staticmethod
+    async def get_available_checkpoints():
+        """Get available checkpoints from the cached catalogs of every backend"""
+        catalogs = await backend_registry.get_catalogs()
+        return merge_choices(catalog.checkpoints for catalog in catalogs)
 
     @staticmethod
     async def get_available_loras():
-        """Get available LoRA models from ComfyUI"""
+        """Get available LoRA models from the cached catalogs of every backend"""
+        catalogs = await backend_registry.get_catalogs()
+        return merge_choices(catalog.loras for catalog in catalogs)
+
+    @staticmethod
+    def frame_count(request: VideoGenerationRequest) -> int:
+        """Frames to render, capped by duration type"""
+        if request.duration_type == "short":
+            return min(request.frames, 30)  # TikTok short
+        elif request.duration_type == "medium":
+            return min(request.frames, 120)  # Medium video
+        else:
+            return min(request.frames, 600)  # Long video
+
+    @staticmethod
+    async def create_video_workflow(request: VideoGenerationRequest):
+        """Create ComfyUI workflow for video generation"""
+        frames = ComfyUIService.frame_count(request)
+        template = workflow_templates.get(request.workflow_template)
+        params = {
+            "prompt": request.prompt,
+            "negative_prompt": request.negative_prompt,
+            "checkpoint": request.checkpoint,
+            "width": request.width,
+            "height": request.height,
+            "frames": frames,
+            "seed": request.seed,
+            "steps": request.steps,
+            "cfg": request.cfg,
+            "sampler": request.sampler,
+            "scheduler": request.scheduler
+        }
+        loras = [(request.lora, request.lora_strength)] if request.lora else []
+        return template.render(params, loras)
+
+    @staticmethod
+    async def queue_prompt(workflow, backend: Optional["ComfyUIBackend"] = None):
+        """Queue a prompt in ComfyUI"""
+        backend = backend or backend_registry.primary
+        if not backend.breaker.allow():
+            return None, None
+        try:
+            # Rendered templates are already encoded and are spliced in as-is
+            if isinstance(workflow, bytes):
+                prompt_data = b'{"prompt":' + workflow + b',"client_id":' + orjson.dumps(COMFYUI_CLIENT_ID) + b"}"
+            else:
+                prompt_data = orjson.dumps({"prompt": workflow, "client_id": COMFYUI_CLIENT_ID})
+            
+            session = get_http_session()
+            async with session.post(
+                f"{backend.base_url}/prompt",
+                data=prompt_data,
+                headers={"Content-Type": "application/json"},
+                timeout=COMFYUI_TIMEOUTS["prompt"]
+            ) as response:
+                backend.breaker.record_response(response.status)
+                if response.status == 200:
+                    result = await response.json()
+                    # Snapshots taken before this prompt was queued would report it as finished
+                    backend.queue.invalidate()
+                    return result.get("prompt_id"), COMFYUI_CLIENT_ID
+                else:
+                    return None, None
+        except Exception as e:
+            backend.breaker.record_error(e)
+            logger.error(f"Error queuing prompt: {e}")
+            return None, None
+
+    @staticmethod
+    async def get_queue_status(backend: Optional["ComfyUIBackend"] = None):
+        """Get ComfyUI queue status"""
+        backend = backend or backend_registry.primary
+        if not backend.breaker.allow():
+            return None
+        try:
+            session = get_http_session()
+            async with session.get(f"{backend.base_url}/queue", timeout=COMFYUI_TIMEOUTS["queue"]) as response:
+                backend.breaker.record_response(response.status)
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    return None
+        except Exception as e:
+            backend.breaker.record_error(e)
+            logger.error(f"Error getting queue status: {e}")
+            return None
+
+    @staticmethod
+    async def cancel_prompt(prompt_id: str, running: bool, backend: Optional["ComfyUIBackend"] = None):
+        """Remove a pending prompt from the ComfyUI queue or interrupt it if running"""
+        backend = backend or backend_registry.primary
+        if not backend.breaker.allow():
+            return False
+        try:
+            session = get_http_session()
+            if running:
+                request = session.post(f"{backend.base_url}/interrupt", json={"prompt_id": prompt_id}, timeout=COMFYUI_TIMEOUTS["queue"])
+            else:
+                request = session.post(f"{backend.base_url}/queue", json={"delete": [prompt_id]}, timeout=COMFYUI_TIMEOUTS["queue"])
+            async with request as response:
+                backend.breaker.record_response(response.status)
+                backend.queue.invalidate()
+                return response.status == 200
+        except Exception as e:
+            backend.breaker.record_error(e)
+            logger.error(f"Error cancelling prompt: {e}")
+            return False
+
+    @staticmethod
+    async def get_history(prompt_id: str, backend: Optional["ComfyUIBackend"] = None):
+        """Get the execution history entry of a prompt from ComfyUI"""
+        backend = backend or backend_registry.primary
+        if not backend.breaker.allow():
+            return None
+        try:
+            session = get_http_session()
+            async with session.get(f"{backend.base_url}/history/{prompt_id}", timeout=COMFYUI_TIMEOUTS["queue"]) as response:
+                backend.breaker.record_response(response.status)
+                if response.status == 200:
+                    history = await response.json()
+                    return history.get(prompt_id)
+                else:
+                    return None
+        except Exception as e:
+            backend.breaker.record_error(e)
+            logger.error(f"Error getting history: {e}")
+            return None
+
+    @staticmethod
+    async def open_view(output: Dict[str, Any], headers: Optional[Dict[str, str]] = None, backend: Optional["ComfyUIBackend"] = None):
+        """Open a streaming response for a generated file from ComfyUI /view.
+
+        The caller owns the returned response and must release it.
+        """
+        backend = backend or backend_registry.primary
+        if not backend.breaker.allow():
+            return None
+        try:
+            params = {
+                "filename": output["filename"],
+                "subfolder": output.get("subfolder", ""),
+                "type": output.get("type", "output")
+            }
+            
+            session = get_http_session()
+            response = await session.get(f"{backend.base_url}/view", params=params, headers=headers, timeout=COMFYUI_TIMEOUTS["view"])
+            backend.breaker.record_response(response.status)
+            return response
+        except Exception as e:
+            backend.breaker.record_error(e)
+            logger.error(f"Error opening image: {e}")
+            return None
+
+    @staticmethod
+    async def get_system_stats(backend: Optional["ComfyUIBackend"] = None):
+        """Probe ComfyUI /system_stats and describe the connection status"""
+        backend = backend or backend_registry.primary
         try:
-            timeout = aiohttp.ClientTimeout(total=10)  # 10 second timeout
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(f"{COMFYUI_BASE_URL}/object_info") as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        loras = []
-                        
-                        # Extract LoRA models
-                        if "LoraLoader" in data:
-                            lora_loader = data["LoraLoader"]
-                            if "input" in lora_loader and "required" in lora_loader["input"]:
-                                if "lora_name" in lora_loader["input"]["required"]:
-                                    loras = lora_loader["input"]["required"]["lora_name"][0]
-                        
-                        return loras
-                    else:
-                        logger.error(f"ComfyUI returned status {response.status}")
-                        return []
+            session = get_http_session()
+            async with session.get(f"{backend.base_url}/system_stats", timeout=COMFYUI_TIMEOUTS["system_stats"]) as response:
+                backend.breaker.record_response(response.status)
+                if response.status == 200:
+                    data = await response.json()
+                    return {"status": "connected", "data": data}
+                else:
+                    return {"status": "disconnected", "error": f"HTTP {response.status}"}
         except asyncio.TimeoutError:
-            logger.error("Timeout connecting to ComfyUI")
-            return []
+            backend.breaker.record_failure()
+            return {"status": "error", "message": "Connection timeout"}
         except aiohttp.ClientConnectorError as e:
-            logger.error(f"Connection error to ComfyUI: {e}")
-            return []
+            backend.breaker.record_failure()
+            return {"status": "error", "message": f"Connection refused: {str(e)}"}
         except Exception as e:
-            logger.error(f"Error getting LoRAs: {e}")
-            return []
+            backend.breaker.record_error(e)
+            return {"status": "error", "message": str(e)}
 
-    @staticmethod
-    async def create_video_workflow(request: VideoGenerationRequest):
-        """Create ComfyUI workflow for video generation"""
-        
-        # Set frames based on duration type
-        if request.duration_type == "short":
-            frames = min(request.frames, 30)  # TikTok short
-        elif request.duration_type == "medium":
-            frames = min(request.frames, 120)  # Medium video
+def extract_input_choices(object_info: Dict[str, Any], node_class: str, input_name: str) -> List[str]:
+    """Extract the list of allowed values for a required node input"""
+    node = object_info.get(node_class) or {}
+    required = (node.get("input") or {}).get("required") or {}
+    spec = required.get(input_name)
+    if spec and isinstance(spec[0], list):
+        return spec[0]
+    return []
+
+def is_link(value: Any) -> bool:
+    """Whether an input value is a [node_id, output_index] reference"""
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], str) and isinstance(value[1], int)
+
+def validate_input(name: str, value: Any, spec: list) -> Optional[str]:
+    """Check a literal input value against its /object_info spec"""
+    kind = spec[0] if spec else None
+    options = spec[1] if len(spec) > 1 and isinstance(spec[1], dict) else {}
+    if kind == "COMBO":
+        kind = options.get("options", [])
+    if isinstance(kind, list):
+        if value not in kind:
+            return f"'{name}' value {value!r} is not one of the {len(kind)} allowed values"
+    elif kind in ("INT", "FLOAT"):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or (kind == "INT" and not isinstance(value, int)):
+            return f"'{name}' must be {kind}, got {value!r}"
+        if "min" in options and value < options["min"]:
+            return f"'{name}' value {value} is below the minimum {options['min']}"
+        if "max" in options and value > options["max"]:
+            return f"'{name}' value {value} is above the maximum {options['max']}"
+    elif kind == "STRING" and not isinstance(value, str):
+        return f"'{name}' must be STRING, got {value!r}"
+    elif kind == "BOOLEAN" and not isinstance(value, bool):
+        return f"'{name}' must be BOOLEAN, got {value!r}"
+    return None
+
+def validate_workflow(workflow: Dict[str, Any], object_info: Dict[str, Any]) -> List[str]:
+    """Check node classes, links, required inputs, enum values and numeric ranges the way ComfyUI would"""
+    errors = []
+    for node_id, node in workflow.items():
+        class_type = node.get("class_type")
+        schema = object_info.get(class_type)
+        if schema is None:
+            errors.append(f"Node {node_id}: unknown node class '{class_type}'")
+            continue
+        inputs = node.get("inputs") or {}
+        required = (schema.get("input") or {}).get("required") or {}
+        optional = (schema.get("input") or {}).get("optional") or {}
+        for name in required:
+            if name not in inputs:
+                errors.append(f"Node {node_id} ({class_type}): missing required input '{name}'")
+        for name, value in inputs.items():
+            if is_link(value):
+                if value[0] not in workflow:
+                    errors.append(f"Node {node_id} ({class_type}): '{name}' links to missing node {value[0]}")
+                continue
+            spec = required.get(name) or optional.get(name)
+            error = validate_input(name, value, spec) if spec else None
+            if error:
+                errors.append(f"Node {node_id} ({class_type}): {error}")
+    return errors
+
+# Keys under which ComfyUI nodes report saved files
+OUTPUT_FILE_KEYS = ("images", "gifs", "videos")
+
+def collect_output_images(history_entry: Dict[str, Any], node_classes: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+    """List the files saved by a prompt, in node order, from its history entry"""
+    # The history entry carries the submitted workflow as prompt[2]
+    prompt = history_entry.get("prompt") or []
+    workflow = prompt[2] if len(prompt) > 2 and isinstance(prompt[2], dict) else {}
+    images = []
+    outputs = history_entry.get("outputs") or {}
+    for node_id in sorted(outputs, key=lambda node: (len(node), node)):
+        if node_classes and workflow and workflow.get(node_id, {}).get("class_type") not in node_classes:
+            continue
+        for key in OUTPUT_FILE_KEYS:
+            for image in outputs[node_id].get(key, []):
+                if image.get("type", "output") == "output":
+                    images.append({**image, "node_id": node_id})
+    return images
+
+def merge_choices(choice_lists) -> List[str]:
+    """Merge model lists from several backends, keeping first-seen order"""
+    merged: Dict[str, None] = {}
+    for choices in choice_lists:
+        merged.update(dict.fromkeys(choices))
+    return list(merged)
+
+class ModelCatalogCache:
+    """Cache of a backend's ComfyUI /object_info.
+
+    Concurrent callers share a single in-flight fetch, entries are refreshed
+    in the background once they pass the refresh-ahead point, and the last
+    good catalog keeps being served while ComfyUI is unreachable.
+    """
+
+    def __init__(self, backend: "ComfyUIBackend", ttl: float, refresh_ahead: float, error_retry: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.error_retry = error_retry
+        self.object_info: Optional[Dict[str, Any]] = None
+        self.checkpoints: List[str] = []
+        self.loras: List[str] = []
+        self.fetched_at = 0.0
+        self.failed_at = 0.0
+        self.last_error: Optional[str] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def is_stale(self) -> bool:
+        return self.object_info is None or self.age() >= self.ttl
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """Return the cached catalog, fetching or refreshing it as needed"""
+        if self.object_info is not None:
+            age = self.age()
+            if age < self.ttl:
+                if age >= self.ttl * self.refresh_ahead:
+                    self.refresh()
+                return self.object_info
+            # Serve stale data while a recent refresh attempt is failing
+            if time.monotonic() - self.failed_at < self.error_retry:
+                return self.object_info
+        await asyncio.shield(self.refresh())
+        return self.object_info
+
+    def refresh(self) -> asyncio.Task:
+        """Start a refresh unless one is already in flight"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    def invalidate(self):
+        self.object_info = None
+        self.checkpoints = []
+        self.loras = []
+        self.fetched_at = 0.0
+        self.failed_at = 0.0
+
+    async def _refresh(self):
+        data = await ComfyUIService.get_object_info(self.backend)
+        if data is None:
+            self.failed_at = time.monotonic()
+            self.last_error = "Failed to fetch /object_info"
+            if self.object_info is not None:
+                logger.warning(f"Serving stale ComfyUI model catalog for {self.backend.name}")
+            return
+        self.object_info = data
+        self.checkpoints = extract_input_choices(data, "CheckpointLoaderSimple", "ckpt_name")
+        self.loras = extract_input_choices(data, "LoraLoader", "lora_name")
+        self.fetched_at = time.monotonic()
+        self.failed_at = 0.0
+        self.last_error = None
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+class ProgressBroker:
+    """Fan-out of generation events to SSE and WebSocket subscribers.
+
+    Each video keeps a small replay buffer so late joiners immediately see
+    the latest transitions instead of waiting for the next event.
+    """
+
+    def __init__(self, replay_size: int, replay_limit: int):
+        self.replay_size = replay_size
+        self.replay_limit = replay_limit
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.replay: "OrderedDict[str, deque]" = OrderedDict()
+
+    def subscribe(self, video_id: str, queue: asyncio.Queue, since: Optional[datetime] = None):
+        """Register a queue for a video and prime it with the replay buffer.
+
+        Callers that already sent a snapshot read at `since` only get the
+        events published after it, so the client never steps back in time.
+        """
+        self.subscribers.setdefault(video_id, set()).add(queue)
+        for event in self.replay.get(video_id, ()):
+            if since is None or datetime.fromisoformat(event["timestamp"]) > since:
+                self._offer(queue, event)
+
+    def unsubscribe(self, video_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(video_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[video_id]
+
+    def publish(self, video_id: str, event: Dict[str, Any]):
+        event = {**event, "video_id": video_id, "timestamp": datetime.utcnow().isoformat()}
+        buffer = self.replay.get(video_id)
+        if buffer is None:
+            buffer = self.replay[video_id] = deque(maxlen=self.replay_size)
+            while len(self.replay) > self.replay_limit:
+                self.replay.popitem(last=False)
         else:
-            frames = min(request.frames, 600)  # Long video
-        
-        # Basic video generation workflow
-        workflow = {
-            "3": {
-                "inputs": {
-                    "seed": 156680208700286,
-                    "steps": 20,
-                    "cfg": 8.0,
-                    "sampler_name": "euler",
-                    "scheduler": "normal",
-                    "denoise": 1.0,
-                    "model": ["4", 0],
-                    "positive": ["6", 0],
-                    "negative": ["7", 0],
-                    "latent_image": ["5", 0]
-                },
-                "class_type": "KSampler",
-                "_meta": {
-                    "title": "KSampler"
-                }
-            },
-            "4": {
-                "inputs": {
-                    "ckpt_name": request.checkpoint
-                },
-                "class_type": "CheckpointLoaderSimple",
-                "_meta": {
-                    "title": "Load Checkpoint"
-                }
-            },
-            "5": {
-                "inputs": {
-                    "width": request.width,
-                    "height": request.height,
-                    "batch_size": frames
-                },
-                "class_type": "EmptyLatentImage",
-                "_meta": {
-                    "title": "Empty Latent Image"
-                }
-            },
-            "6": {
-                "inputs": {
-                    "text": request.prompt,
-                    "clip": ["4", 1]
-                },
-                "class_type": "CLIPTextEncode",
-                "_meta": {
-                    "title": "CLIP Text Encode (Prompt)"
-                }
-            },
-            "7": {
-                "inputs": {
-                    "text": "blurry, low quality, distorted",
-                    "clip": ["4", 1]
-                },
-                "class_type": "CLIPTextEncode",
-                "_meta": {
-                    "title": "CLIP Text Encode (Negative)"
-                }
-            },
-            "8": {
-                "inputs": {
-                    "samples": ["3", 0],
-                    "vae": ["4", 2]
-                },
-                "class_type": "VAEDecode",
-                "_meta": {
-                    "title": "VAE Decode"
-                }
+            self.replay.move_to_end(video_id)
+        buffer.append(event)
+        for queue in self.subscribers.get(video_id, ()):
+            self._offer(queue, event)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict[str, Any]):
+        # Slow consumers lose their oldest events rather than blocking publishers
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+progress_broker = ProgressBroker(STREAM_REPLAY_SIZE, STREAM_REPLAY_LIMIT)
+
+class QueueSnapshot:
+    """Single-flight, briefly cached view of the ComfyUI /queue.
+
+    Every caller inside the freshness window shares one upstream request, and
+    prompts are indexed by id so lookups do not scan the queue.
+    """
+
+    def __init__(self, backend: "ComfyUIBackend", max_age: float):
+        self.backend = backend
+        self.max_age = max_age
+        self.raw: Optional[Dict[str, Any]] = None
+        self.index: Dict[str, Dict[str, Any]] = {}
+        self.fetched_at = 0.0
+        self._version = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def is_fresh(self) -> bool:
+        return self.raw is not None and time.monotonic() - self.fetched_at < self.max_age
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """Return a snapshot no older than max_age, or None if ComfyUI is unreachable"""
+        while not self.is_fresh():
+            version = self._version
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh())
+            await asyncio.shield(self._refresh_task)
+            if version == self._version:
+                break
+            # Invalidated while in flight: wait for a snapshot taken after that
+        return self.raw
+
+    def depth(self) -> int:
+        """Number of prompts running or waiting in the snapshot"""
+        return len(self.index)
+
+    def locate(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """Queue state and position of a prompt, or None if it is not queued"""
+        return self.index.get(prompt_id)
+
+    def invalidate(self):
+        """Force the next lookup to fetch a snapshot taken after this call"""
+        self._version += 1
+        self._refresh_task = None
+        self.raw = None
+        self.index = {}
+        self.fetched_at = 0.0
+
+    async def _refresh(self):
+        version = self._version
+        raw = await ComfyUIService.get_queue_status(self.backend)
+        if version != self._version:
+            # Invalidated while in flight, e.g. a prompt was queued meanwhile
+            return
+        self.fetched_at = time.monotonic()
+        self.raw = raw
+        self.index = {}
+        if not raw:
+            return
+        running = raw.get("queue_running", [])
+        # Pending items are executed in order of their queue number
+        pending = sorted(raw.get("queue_pending", []), key=lambda item: item[0])
+        for item in running:
+            self.index[item[1]] = {"state": "running", "position": 0}
+        for position, item in enumerate(pending, start=len(running)):
+            self.index[item[1]] = {"state": "pending", "position": position}
+
+async def find_active_video_ids(prompt_id: str) -> List[str]:
+    """Ids of the generations still waiting on a ComfyUI prompt"""
+    generations = await db.video_generations.find(
+        {"comfyui_prompt_id": prompt_id, "status": {"$in": ["pending", "queued", "processing"]}},
+        {"id": 1}
+    ).to_list(None)
+    return [gen["id"] for gen in generations]
+
+async def mark_prompt_completed(prompt_id: str, outputs: Optional[List[Dict[str, Any]]] = None):
+    """Mark every active generation attached to a ComfyUI prompt as completed"""
+    render_seconds = dispatch_queue.release(prompt_id, completed=True)
+    video_ids = await find_active_video_ids(prompt_id)
+    if not video_ids:
+        return
+    update = {"status": "completed", "completed_at": datetime.utcnow(), "progress": 1.0, "harvest_status": "pending"}
+    if render_seconds is not None:
+        update["render_seconds"] = render_seconds
+    if outputs:
+        update["outputs"] = outputs
+    await db.video_generations.update_many(
+        {"id": {"$in": video_ids}},
+        {"$set": update}
+    )
+    output_harvester.schedule(prompt_id)
+    for video_id in video_ids:
+        progress_broker.publish(video_id, {"type": "completed", "status": "completed", "progress": 1.0})
+
+async def mark_prompt_failed(prompt_id: str, error_message: str):
+    """Mark every active generation attached to a ComfyUI prompt as failed"""
+    dispatch_queue.release(prompt_id)
+    video_ids = await find_active_video_ids(prompt_id)
+    if not video_ids:
+        return
+    await db.video_generations.update_many(
+        {"id": {"$in": video_ids}},
+        {"$set": {"status": "failed", "error_message": error_message}}
+    )
+    for video_id in video_ids:
+        progress_broker.publish(video_id, {"type": "failed", "status": "failed", "error_message": error_message})
+
+def execution_error_message(event: str, data: Dict[str, Any]) -> str:
+    """Error message for an execution_error or execution_interrupted event"""
+    if event == "execution_interrupted":
+        return "Execution interrupted"
+    error_message = data.get("exception_message") or "ComfyUI execution error"
+    if data.get("node_type"):
+        error_message = f"{data['node_type']}: {error_message}"
+    return error_message
+
+def history_error_message(history_entry: Dict[str, Any]) -> Optional[str]:
+    """Why a prompt failed according to its history entry, or None if it succeeded"""
+    status = history_entry.get("status") or {}
+    if status.get("status_str", "success") == "success":
+        return None
+    for event, data in reversed(status.get("messages") or []):
+        if event in ("execution_error", "execution_interrupted"):
+            return execution_error_message(event, data or {})
+    return "ComfyUI execution error"
+
+async def settle_prompt(prompt_id: str, backend: "ComfyUIBackend"):
+    """Mark a prompt that left the ComfyUI queue completed or failed, as its history entry tells"""
+    history = await ComfyUIService.get_history(prompt_id, backend)
+    error_message = history_error_message(history) if history else None
+    if error_message:
+        await mark_prompt_failed(prompt_id, error_message)
+    else:
+        await mark_prompt_completed(prompt_id)
+
+class ComfyUIEventListener:
+    """Long-lived subscriber to the ComfyUI /ws event feed.
+
+    Execution events update the matching video_generations records as they
+    arrive and keep per-prompt progress in memory, so status reads need no
+    upstream call while the feed is connected.
+    """
+
+    def __init__(self, backend: "ComfyUIBackend", client_id: str):
+        self.backend = backend
+        self.client_id = client_id
+        self.connected = False
+        self.prompt_states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.prompt_videos: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self.current_prompt_id: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ws = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reconnect(self):
+        """Drop the current connection so the next attempt uses the latest URL"""
+        if self._ws is not None:
+            asyncio.create_task(self._ws.close())
+
+    def get_state(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        return self.prompt_states.get(prompt_id)
+
+    def watch(self, prompt_id: str, video_id: str):
+        """Route events for a prompt to a generation's subscribers"""
+        self.prompt_videos.setdefault(prompt_id, set()).add(video_id)
+        self.prompt_videos.move_to_end(prompt_id)
+        while len(self.prompt_videos) > COMFYUI_WS_STATE_LIMIT:
+            self.prompt_videos.popitem(last=False)
+
+    def unwatch(self, prompt_id: str, video_id: str):
+        """Stop routing a prompt's events to a generation"""
+        video_ids = self.prompt_videos.get(prompt_id)
+        if video_ids is not None:
+            video_ids.discard(video_id)
+
+    async def _publish(self, prompt_id: str, event: Dict[str, Any]):
+        video_ids = self.prompt_videos.get(prompt_id)
+        if video_ids is None:
+            # Prompts queued before a restart are resolved once from the database
+            found = await find_active_video_ids(prompt_id)
+            if not found:
+                return
+            for video_id in found:
+                self.watch(prompt_id, video_id)
+            video_ids = self.prompt_videos[prompt_id]
+        for video_id in video_ids:
+            progress_broker.publish(video_id, event)
+
+    def _state(self, prompt_id: str) -> Dict[str, Any]:
+        state = self.prompt_states.get(prompt_id)
+        if state is None:
+            state = {"status": "processing", "node": None, "progress": 0.0, "outputs": [], "error": None}
+            self.prompt_states[prompt_id] = state
+            while len(self.prompt_states) > COMFYUI_WS_STATE_LIMIT:
+                self.prompt_states.popitem(last=False)
+        return state
+
+    async def _run(self):
+        delay = COMFYUI_WS_RECONNECT_MIN
+        while True:
+            url = f"{self.backend.ws_url}?clientId={self.client_id}"
+            try:
+                async with websockets.connect(url, max_size=None, ping_interval=20) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    delay = COMFYUI_WS_RECONNECT_MIN
+                    logger.info(f"Subscribed to ComfyUI events at {self.backend.ws_url}")
+                    await self._resync()
+                    async for message in ws:
+                        # Binary frames carry live previews, which we do not use
+                        if isinstance(message, bytes):
+                            continue
+                        try:
+                            await self._handle(json.loads(message))
+                        except Exception as e:
+                            logger.error(f"Error handling ComfyUI event: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"ComfyUI event feed unavailable for {self.backend.name}: {e}")
+            finally:
+                self._ws = None
+                self.connected = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, COMFYUI_WS_RECONNECT_MAX)
+
+    async def _resync(self):
+        """Catch up on prompts that finished while we were disconnected"""
+        processing = await db.video_generations.find(
+            {
+                "status": "processing",
+                "comfyui_prompt_id": {"$ne": None},
+                "comfyui_backend": {"$in": self.backend.record_names()}
             },
-            "9": {
-                "inputs": {
-                    "filename_prefix": "ComfyUI_video",
-                    "images": ["8", 0]
-                },
-                "class_type": "SaveImage",
-                "_meta": {
-                    "title": "Save Image"
-                }
-            }
+            {"comfyui_prompt_id": 1}
+        ).to_list(None)
+        if not processing:
+            return
+        if not await self.backend.queue.get():
+            return
+        for prompt_id in {gen["comfyui_prompt_id"] for gen in processing}:
+            if self.backend.queue.locate(prompt_id) is None:
+                await settle_prompt(prompt_id, self.backend)
+
+    async def _handle(self, message: Dict[str, Any]):
+        event = message.get("type")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id") or self.current_prompt_id
+
+        if event == "execution_start":
+            self.current_prompt_id = prompt_id
+            self._state(prompt_id)["status"] = "running"
+            dispatch_queue.record_start(prompt_id)
+            await self._publish(prompt_id, {"type": "status", "status": "processing", "progress": 0.0})
+        elif event == "execution_success" or (event == "executing" and data.get("node") is None):
+            # A null executing node marks the end of the prompt
+            if not prompt_id:
+                return
+            state = self._state(prompt_id)
+            self._node_finished(prompt_id, state)
+            if state["status"] not in ("completed", "failed"):
+                state.update(status="completed", node=None, progress=1.0)
+                await mark_prompt_completed(prompt_id, state["outputs"])
+            if self.current_prompt_id == prompt_id:
+                self.current_prompt_id = None
+        elif event == "executing":
+            if prompt_id:
+                self.current_prompt_id = prompt_id
+                state = self._state(prompt_id)
+                self._node_finished(prompt_id, state)
+                state.update(node=data.get("node"), node_started=time.monotonic())
+        elif event == "progress":
+            if prompt_id and data.get("max"):
+                state = self._state(prompt_id)
+                state["node"] = data.get("node", state["node"])
+                state["progress"] = data.get("value", 0) / data["max"]
+                await self._publish(prompt_id, {
+                    "type": "progress",
+                    "status": "processing",
+                    "progress": state["progress"],
+                    "node": state["node"],
+                    "value": data.get("value", 0),
+                    "max": data["max"]
+                })
+        elif event == "executed":
+            if prompt_id:
+                output = data.get("output") or {}
+                self._state(prompt_id)["outputs"].extend(
+                    image for image in output.get("images", []) if image.get("type", "output") == "output"
+                )
+        elif event in ("execution_error", "execution_interrupted"):
+            if not prompt_id:
+                return
+            error_message = execution_error_message(event, data)
+            self._state(prompt_id).update(status="failed", error=error_message)
+            await mark_prompt_failed(prompt_id, error_message)
+
+    def _node_finished(self, prompt_id: str, state: Dict[str, Any]):
+        """Report how long the node that just stopped executing took"""
+        if state["node"] is not None and state.get("node_started") is not None:
+            dispatch_queue.record_node(prompt_id, state["node"], time.monotonic() - state["node_started"])
+        state["node_started"] = None
+
+    async def sync_prompt(self, prompt_id: str):
+        """Apply a terminal state that arrived before the prompt id was stored"""
+        state = self.prompt_states.get(prompt_id)
+        if state is None:
+            return
+        if state["status"] == "completed":
+            await mark_prompt_completed(prompt_id, state["outputs"])
+        elif state["status"] == "failed":
+            await mark_prompt_failed(prompt_id, state["error"])
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker guarding the calls to one backend.
+
+    After enough consecutive failures the circuit opens and callers fail
+    fast. Once the reset timeout has passed a single trial call is let
+    through (half-open), and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_started_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if self.state == "open":
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        # Half-open: let one trial call through per reset period
+        if now - self._trial_started_at < self.reset_timeout:
+            return False
+        self._trial_started_at = now
+        return True
+
+    def ready(self) -> bool:
+        """Whether allow() would let a call through, without starting a trial"""
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if self.state == "open" and now - self.opened_at < self.reset_timeout:
+            return False
+        return now - self._trial_started_at >= self.reset_timeout
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"ComfyUI circuit opened for {self.name}")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def record_response(self, status: int):
+        """Count server errors as failures; any other response proves the backend is up"""
+        if status >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_error(self, error: Exception):
+        if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+            self.record_failure()
+
+    def reset(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_started_at = 0.0
+
+MODEL_LOADER_CLASSES = {"CheckpointLoaderSimple", "LoraLoader", "LoraLoaderModelOnly"}
+
+class DispatchJob:
+    """A unique workflow waiting for, or holding, a slot in a ComfyUI instance"""
+
+    def __init__(self, key: str, workflow: bytes, checkpoint: str, lora: Optional[str],
+                 priority: str = "normal", work: float = 0.0, vram: int = 0):
+        self.key = key
+        self.workflow = workflow
+        self.models = (checkpoint, lora)
+        self.work = work
+        self.vram = vram
+        self.rank = DISPATCH_PRIORITIES.index(priority)
+        self.video_ids: List[str] = []
+        self.loaders = {
+            node_id for node_id, node in orjson.loads(workflow).items()
+            if node.get("class_type") in MODEL_LOADER_CLASSES
+        }
+        self.enqueued_at = time.monotonic()
+        self.skips = 0
+        self.prompt_id: Optional[str] = None
+        self.backend: Optional[str] = None
+        self.dispatched_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.load_seconds = 0.0
+
+    def waited(self) -> float:
+        return time.monotonic() - self.enqueued_at
+
+    def estimate(self) -> Optional[float]:
+        return runtime_estimator.predict(self.models[0], self.work)
+
+    def remaining(self) -> Optional[float]:
+        """Estimated seconds until the job's prompt finishes, excluding waits"""
+        estimate = self.estimate()
+        if estimate is None or self.started_at is None:
+            return estimate
+        return max(estimate - (time.monotonic() - self.started_at - self.load_seconds), 0.0)
+
+class DispatchLane:
+    """Prompts a backend is working on, the models they leave loaded and swap statistics"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.inflight: Dict[str, DispatchJob] = {}
+        self.models: Optional[tuple] = None
+        self.dispatched = 0
+        self.swaps = 0
+        self.pulled_forward = 0
+        self.loads = 0
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def free(self) -> int:
+        return self.window - len(self.inflight)
+
+    def record_load(self, seconds: float):
+        """Fold the model load time of a finished prompt into the moving average"""
+        self.loads += 1
+        self.load_seconds = seconds if self.load_seconds is None else 0.8 * self.load_seconds + 0.2 * seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        checkpoint, lora = self.models or (None, None)
+        return {
+            "window": self.window,
+            "inflight": len(self.inflight),
+            "checkpoint": checkpoint,
+            "lora": lora,
+            "dispatched": self.dispatched,
+            "swaps": self.swaps,
+            "swap_rate": self.swaps / self.dispatched if self.dispatched else None,
+            "pulled_forward": self.pulled_forward,
+            "model_loads": self.loads,
+            "avg_load_seconds": self.load_seconds
+        }
+
+class ComfyUIBackend:
+    """A ComfyUI instance with its own catalog, queue snapshot and event feed"""
+
+    def __init__(self, base_url: str, ws_url: Optional[str] = None, primary: bool = False):
+        self.primary = primary
+        self.breaker = CircuitBreaker(base_url, COMFYUI_BREAKER_FAILURE_THRESHOLD, COMFYUI_BREAKER_RESET_TIMEOUT)
+        self.configure(base_url, ws_url)
+        self.health: Dict[str, Any] = {"status": "checking"}
+        self.catalog = ModelCatalogCache(
+            self,
+            ttl=COMFYUI_OBJECT_INFO_TTL,
+            refresh_ahead=COMFYUI_OBJECT_INFO_REFRESH_AHEAD,
+            error_retry=COMFYUI_OBJECT_INFO_ERROR_RETRY,
+        )
+        self.queue = QueueSnapshot(self, COMFYUI_QUEUE_SNAPSHOT_TTL)
+        self.listener = ComfyUIEventListener(self, COMFYUI_CLIENT_ID)
+        self.lane = DispatchLane(DISPATCH_WINDOW)
+        self.vram_total: Optional[int] = None
+        self.vram_capacity: Optional[int] = None
+
+    def configure(self, base_url: str, ws_url: Optional[str] = None):
+        self.base_url = base_url.rstrip('/')
+        self.ws_url = ws_url or websocket_url(self.base_url)
+        self.name = urlparse(self.base_url).netloc or self.base_url
+        self.breaker.name = self.name
+
+    def record_names(self) -> List[Optional[str]]:
+        """Values of comfyui_backend that refer to this backend"""
+        # Records created before multi-backend support have no backend set
+        return [self.name, None] if self.primary else [self.name]
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state != "open"
+
+    async def probe(self):
+        """Refresh the cached /system_stats result and feed it to the breaker"""
+        result = await ComfyUIService.get_system_stats(self)
+        result["checked_at"] = datetime.utcnow().isoformat()
+        self.health = result
+        self.update_vram(result.get("data") or {})
+
+    def update_vram(self, stats: Dict[str, Any]):
+        """Track the VRAM a prompt can use from /system_stats.
+
+        Memory held by the loaded models is usable, since ComfyUI unloads them
+        on demand. Samples taken while prompts run miss their activations, so
+        those only stand in until the backend is next seen idle.
+        """
+        gpus = [device for device in stats.get("devices") or [] if device.get("type") != "cpu" and device.get("vram_total")]
+        if not gpus:
+            return
+        self.vram_total = gpus[0]["vram_total"]
+        if self.lane.inflight and self.vram_capacity is not None:
+            return
+        if self.lane.inflight:
+            self.vram_capacity = self.vram_total
+            return
+        loaded = model_vram_bytes(*self.lane.models) if self.lane.models else 0
+        self.vram_capacity = min(gpus[0].get("vram_free", 0) + loaded, self.vram_total)
+
+    def fits(self, vram: int) -> bool:
+        """Whether a prompt needing this much VRAM fits, when the backend reports VRAM"""
+        return self.vram_capacity is None or vram <= self.vram_capacity - VRAM_RESERVE_GB * GIB
+
+    def reset(self):
+        self.breaker.reset()
+        self.health = {"status": "checking"}
+        self.vram_total = self.vram_capacity = None
+        self.catalog.invalidate()
+        self.queue.invalidate()
+        self.listener.reconnect()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "ws_url": self.ws_url,
+            "primary": self.primary,
+            "healthy": self.healthy,
+            "circuit": self.breaker.state,
+            "events_connected": self.listener.connected,
+            "queue_depth": self.queue.depth() if self.queue.raw is not None else None,
+            "dispatch_inflight": len(self.lane.inflight),
+            "vram_total": self.vram_total,
+            "vram_capacity": self.vram_capacity
         }
+
+class BackendRegistry:
+    """The ComfyUI instances this API dispatches work to"""
+
+    def __init__(self):
+        self.backends: Dict[str, ComfyUIBackend] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self.primary = self.add(COMFYUI_BASE_URL, COMFYUI_WS_URL, primary=True)
+        for base_url in COMFYUI_EXTRA_URLS:
+            self.add(base_url)
+
+    def add(self, base_url: str, ws_url: Optional[str] = None, primary: bool = False) -> ComfyUIBackend:
+        backend = ComfyUIBackend(base_url, ws_url, primary=primary)
+        if backend.name in self.backends:
+            return self.backends[backend.name]
+        self.backends[backend.name] = backend
+        return backend
+
+    def all(self) -> List[ComfyUIBackend]:
+        return list(self.backends.values())
+
+    def get(self, name: Optional[str]) -> ComfyUIBackend:
+        """Backend a record was dispatched to, falling back to the primary"""
+        return self.backends.get(name) or self.primary
+
+    def reconfigure_primary(self, base_url: str, ws_url: str):
+        del self.backends[self.primary.name]
+        self.primary.configure(base_url, ws_url)
+        duplicate = self.backends.pop(self.primary.name, None)
+        if duplicate is not None:
+            asyncio.create_task(duplicate.listener.stop())
+        self.backends = {self.primary.name: self.primary, **self.backends}
+        self.primary.reset()
+        asyncio.create_task(self.primary.probe())
+
+    def start(self):
+        for backend in self.all():
+            backend.catalog.refresh()
+            backend.listener.start()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for backend in self.all():
+            await backend.listener.stop()
+
+    async def _health_loop(self):
+        while True:
+            try:
+                await asyncio.gather(*(backend.probe() for backend in self.all()))
+            except Exception as e:
+                logger.error(f"Error probing ComfyUI health: {e}")
+            await asyncio.sleep(COMFYUI_HEALTH_INTERVAL)
+
+    async def get_catalogs(self) -> List[ModelCatalogCache]:
+        backends = self.all()
+        await asyncio.gather(*(backend.catalog.get() for backend in backends))
+        return [backend.catalog for backend in backends]
+
+backend_registry = BackendRegistry()
+
+class RuntimeFit:
+    """Exponentially weighted least squares fit of seconds = intercept + slope * work"""
+
+    def __init__(self):
+        self.weight = self.sum_x = self.sum_y = self.sum_xx = self.sum_xy = 0.0
+        self.samples = 0
+        self.intercept: Optional[float] = None
+        self.slope: Optional[float] = None
+
+    def add(self, work: float, seconds: float):
+        self.weight = self.weight * ESTIMATOR_DECAY + 1
+        self.sum_x = self.sum_x * ESTIMATOR_DECAY + work
+        self.sum_y = self.sum_y * ESTIMATOR_DECAY + seconds
+        self.sum_xx = self.sum_xx * ESTIMATOR_DECAY + work * work
+        self.sum_xy = self.sum_xy * ESTIMATOR_DECAY + work * seconds
+        self.samples += 1
+
+    def refit(self):
+        if self.samples < ESTIMATOR_MIN_SAMPLES or self.sum_x <= 0:
+            return
+        denominator = self.weight * self.sum_xx - self.sum_x ** 2
+        slope = (self.weight * self.sum_xy - self.sum_x * self.sum_y) / denominator if denominator > 1e-9 * self.sum_xx else 0.0
+        intercept = (self.sum_y - slope * self.sum_x) / self.weight
+        if slope <= 0 or intercept < 0:
+            # Too little spread in work for a line: fall back to seconds proportional to work
+            slope, intercept = self.sum_xy / self.sum_xx, 0.0
+        self.intercept, self.slope = intercept, slope
+
+    def predict(self, work: float) -> Optional[float]:
+        if self.slope is None:
+            return None
+        return self.intercept + self.slope * work
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"samples": self.samples, "intercept": self.intercept, "seconds_per_megapixel_step": self.slope}
+
+class RuntimeEstimator:
+    """Predicts render seconds per checkpoint from completed generations.
+
+    Completions are buffered as they arrive and folded into the fits by a
+    background task, so predictions only read the last fitted coefficients.
+    """
+
+    def __init__(self):
+        self.fits: Dict[str, RuntimeFit] = {}
+        self.overall = RuntimeFit()
+        self._observations: List[tuple] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def observe(self, checkpoint: str, work: float, seconds: float):
+        self._observations.append((checkpoint, work, seconds))
+
+    def predict(self, checkpoint: str, work: float) -> Optional[float]:
+        """Render seconds for a checkpoint, or the overall fit while it has too few samples"""
+        fit = self.fits.get(checkpoint)
+        if fit is None or fit.slope is None:
+            fit = self.overall
+        return fit.predict(work)
+
+    def refit(self):
+        observations, self._observations = self._observations, []
+        for checkpoint, work, seconds in observations:
+            self.fits.setdefault(checkpoint, RuntimeFit()).add(work, seconds)
+            self.overall.add(work, seconds)
+        if observations:
+            for fit in (*self.fits.values(), self.overall):
+                fit.refit()
+
+    async def load(self):
+        """Seed the fits from recent completions, one per ComfyUI prompt"""
+        generations = await db.video_generations.find(
+            {"status": "completed", "cached_from": None, "segment_count": None, "completed_at": {"$ne": None}}
+        ).sort("completed_at", -1).limit(ESTIMATOR_HISTORY).to_list(None)
+        prompts: Set[str] = set()
+        for gen in reversed(generations):
+            if gen.get("comfyui_prompt_id") in prompts:
+                continue
+            prompts.add(gen.get("comfyui_prompt_id"))
+            # Records from before render times were stored only have their time in the system
+            seconds = gen.get("render_seconds") or (gen["completed_at"] - gen["created_at"]).total_seconds()
+            try:
+                self.observe(gen["checkpoint"], render_work(VideoGenerationRequest(**gen)), seconds)
+            except Exception:
+                continue
+        self.refit()
+
+    async def _run(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Error loading runtime history: {e}")
+        while True:
+            await asyncio.sleep(ESTIMATOR_REFIT_INTERVAL)
+            try:
+                self.refit()
+            except Exception as e:
+                logger.error(f"Error refitting runtime estimates: {e}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "overall": self.overall.to_dict(),
+            "checkpoints": {checkpoint: fit.to_dict() for checkpoint, fit in self.fits.items()},
+            "pending_observations": len(self._observations)
+        }
+
+runtime_estimator = RuntimeEstimator()
+
+class DispatchQueue:
+    """Holds generations until a backend has room, keeping only a small window of
+    prompts inside each ComfyUI instance.
+
+    ComfyUI runs its queue in order and reloads models whenever consecutive
+    prompts use a different checkpoint or LoRA. Holding the backlog here lets a
+    free slot go to a job matching what the backend already has loaded, as long
+    as no older job has waited longer than a few measured model swaps.
+    """
+
+    def __init__(self):
+        self.pending: List[DispatchJob] = []
+        self.jobs: Dict[str, DispatchJob] = {}  # share key -> queued or in-flight job
+        self.prompts: Dict[str, tuple] = {}  # prompt id -> (job, backend)
+        self.drained: deque = deque()  # release times within the drain window
+        self.started_at = time.monotonic()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._reconcile_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def resume(self):
+        """Queue again the generations that were waiting when the server stopped"""
+        await self._restore_inflight()
+        generations = await db.video_generations.find({"status": "queued"}).sort("created_at", 1).to_list(None)
+        for gen in generations:
+            try:
+                request = VideoGenerationRequest(**gen)
+                video_gen = VideoGeneration(**gen)
+                self.enqueue(video_gen, await ComfyUIService.create_video_workflow(request), request.use_cache)
+            except Exception as e:
+                logger.error(f"Error requeueing generation {gen['id']}: {e}")
+                await db.video_generations.update_one(
+                    {"id": gen["id"]},
+                    {"$set": {"status": "failed", "error_message": str(e)}}
+                )
+
+    async def _restore_inflight(self):
+        """Put prompts still in ComfyUI from before a restart back into their lanes.
+
+        They hold slots and leave their models loaded like freshly sent ones;
+        those that already finished are released by the listener's resync or
+        the next reconcile.
+        """
+        generations = await db.video_generations.find(
+            {"status": "processing", "comfyui_prompt_id": {"$ne": None}}
+        ).sort("created_at", 1).to_list(None)
+        for gen in generations:
+            prompt_id = gen["comfyui_prompt_id"]
+            entry = self.prompts.get(prompt_id)
+            if entry is not None:
+                entry[0].video_ids.append(gen["id"])
+                continue
+            try:
+                request = VideoGenerationRequest(**gen)
+                video_gen = VideoGeneration(**gen)
+                workflow = await ComfyUIService.create_video_workflow(request)
+            except Exception as e:
+                logger.error(f"Error restoring dispatched generation {gen['id']}: {e}")
+                continue
+            backend = backend_registry.get(gen.get("comfyui_backend"))
+            job = DispatchJob(
+                video_gen.workflow_hash if request.use_cache else video_gen.id, workflow,
+                video_gen.checkpoint, video_gen.lora, video_gen.priority,
+                render_work(video_gen), vram_required(video_gen)
+            )
+            job.video_ids.append(gen["id"])
+            job.prompt_id, job.backend, job.dispatched_at = prompt_id, backend.name, time.monotonic()
+            self.jobs[job.key] = job
+            self.prompts[prompt_id] = (job, backend)
+            backend.lane.inflight[prompt_id] = job
+            # The newest prompt runs last, so its models stay loaded
+            backend.lane.models = job.models
+
+    def budget(self) -> float:
+        """Seconds a job may be passed over for jobs matching loaded models"""
+        measured = [backend.lane.load_seconds for backend in backend_registry.all() if backend.lane.load_seconds is not None]
+        swap_seconds = sum(measured) / len(measured) if measured else DISPATCH_DEFAULT_SWAP_SECONDS
+        return min(DISPATCH_MAX_WAIT, DISPATCH_SWAP_BUDGET * swap_seconds)
+
+    def drain_rate(self) -> Optional[float]:
+        """Prompts finished per second over the drain window"""
+        now = time.monotonic()
+        while self.drained and now - self.drained[0] > DISPATCH_DRAIN_WINDOW:
+            self.drained.popleft()
+        if not self.drained:
+            return None
+        return len(self.drained) / max(min(DISPATCH_DRAIN_WINDOW, now - self.started_at), 1.0)
+
+    def backlog(self, priority: str) -> int:
+        """Queued jobs that run before or alongside a job of the given priority"""
+        rank = DISPATCH_PRIORITIES.index(priority)
+        return sum(1 for job in self.pending if job.rank <= rank)
+
+    def admit(self, priority: str, jobs: int = 1):
+        """Reject work that would overflow the backlog of its lane.
+
+        Only jobs of the same or a higher priority count, so queued bulk work
+        never turns away more urgent submissions.
+        """
+        if jobs > DISPATCH_MAX_BACKLOG:
+            raise HTTPException(status_code=400, detail=f"{jobs} jobs exceed the dispatch backlog limit of {DISPATCH_MAX_BACKLOG}")
+        backlog = self.backlog(priority)
+        excess = backlog + jobs - DISPATCH_MAX_BACKLOG
+        if excess <= 0:
+            return
+        rate = self.drain_rate()
+        retry_after = math.ceil(excess / rate) if rate else DISPATCH_RETRY_AFTER_DEFAULT
+        raise HTTPException(
+            status_code=429,
+            detail=f"Dispatch queue is full ({backlog} {priority} or higher priority jobs waiting)",
+            headers={"Retry-After": str(min(max(retry_after, 1), DISPATCH_RETRY_AFTER_MAX))}
+        )
+
+    def enqueue(self, video_gen: VideoGeneration, workflow: bytes, shareable: bool = True) -> DispatchJob:
+        """Add a generation, sharing the job of an identical queued or running workflow"""
+        key = video_gen.workflow_hash if shareable else video_gen.id
+        job = self.jobs.get(key)
+        if job is None:
+            job = DispatchJob(
+                key, workflow, video_gen.checkpoint, video_gen.lora,
+                video_gen.priority, render_work(video_gen), vram_required(video_gen)
+            )
+            self.jobs[key] = job
+            self._insert(job)
+            self._wake()
+        elif job.prompt_id is None and DISPATCH_PRIORITIES.index(video_gen.priority) < job.rank:
+            # A more urgent submission of the same workflow promotes the shared job
+            job.rank = DISPATCH_PRIORITIES.index(video_gen.priority)
+            if job in self.pending:
+                self.pending.remove(job)
+                self._insert(job)
+        job.video_ids.append(video_gen.id)
+        return job
+
+    def _insert(self, job: DispatchJob):
+        """Queue a job behind every job of its own or a higher priority"""
+        index = next((index for index, queued in enumerate(self.pending) if queued.rank > job.rank), len(self.pending))
+        self.pending.insert(index, job)
+
+    def withdraw(self, video_id: str) -> Optional[DispatchJob]:
+        """Take a cancelled generation off its job, dropping the job if nobody else waits on it"""
+        job = next((job for job in self.jobs.values() if video_id in job.video_ids), None)
+        if job is None or job.prompt_id is not None:
+            return job
+        job.video_ids.remove(video_id)
+        if not job.video_ids and job in self.pending:
+            self.pending.remove(job)
+            del self.jobs[job.key]
+        return job
+
+    def eta(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Queue position and estimated seconds until a generation's prompt finishes.
+
+        Queued jobs of higher lanes and shorter jobs of the same lane run
+        first. Work ahead, including what is still running, is assumed to
+        spread evenly over the healthy backends.
+        """
+        job = next((job for job in self.jobs.values() if video_id in job.video_ids), None)
+        if job is None:
+            return None
+        if job.prompt_id is not None:
+            return {"queue_position": None, "eta_seconds": job.remaining()}
+        estimate = job.estimate()
+        order = {other.key: index for index, other in enumerate(self.pending)}
         
-        # Add LoRA if specified
-        if request.lora:
-            workflow["10"] = {
-                "inputs": {
-                    "lora_name": request.lora,
-                    "strength_model": 1.0,
-                    "strength_clip": 1.0,
-                    "model": ["4", 0],
-                    "clip": ["4", 1]
-                },
-                "class_type": "LoraLoader",
-                "_meta": {
-                    "title": "Load LoRA"
-                }
-            }
-            # Update model and clip references
-            workflow["3"]["inputs"]["model"] = ["10", 0]
-            workflow["6"]["inputs"]["clip"] = ["10", 1]
-            workflow["7"]["inputs"]["clip"] = ["10", 1]
+        def runs_before(other: DispatchJob) -> bool:
+            if other.rank != job.rank:
+                return other.rank < job.rank
+            # Mirrors dispatch: shortest first, unestimated jobs behind in arrival order
+            other_estimate = other.estimate()
+            if (other_estimate is None) != (estimate is None):
+                return estimate is None
+            if other_estimate == estimate:
+                return order[other.key] < order.get(job.key, len(order))
+            return other_estimate < estimate
+        
+        queued = [other for other in self.pending if other is not job and runs_before(other)]
+        backends = [backend for backend in backend_registry.all() if backend.healthy] or backend_registry.all()
+        running = [other for backend in backends for other in backend.lane.inflight.values()]
+        estimates = [other.remaining() for other in running + queued]
+        if estimate is None or any(other is None for other in estimates):
+            return {"queue_position": len(queued), "eta_seconds": None}
+        return {"queue_position": len(queued), "eta_seconds": sum(estimates) / len(backends) + estimate}
+
+    def record_start(self, prompt_id: str):
+        entry = self.prompts.get(prompt_id)
+        if entry is not None:
+            entry[0].started_at = time.monotonic()
+
+    def release(self, prompt_id: str, completed: bool = False) -> Optional[float]:
+        """Free the slot of a prompt that finished, failed or was removed from ComfyUI.
+
+        Returns the render time of a completed prompt whose start was seen,
+        which also feeds the runtime estimator net of model loading.
+        """
+        entry = self.prompts.pop(prompt_id, None)
+        if entry is None:
+            return None
+        job, backend = entry
+        backend.lane.inflight.pop(prompt_id, None)
+        self.drained.append(time.monotonic())
+        if job.load_seconds:
+            backend.lane.record_load(job.load_seconds)
+        if self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+        self._wake()
+        if not completed or job.started_at is None:
+            return None
+        seconds = time.monotonic() - job.started_at
+        runtime_estimator.observe(job.models[0], job.work, max(seconds - job.load_seconds, 0.0))
+        return seconds
+
+    def record_node(self, prompt_id: str, node_id: str, seconds: float):
+        """Execution time of a node, as reported by the event feed.
+
+        ComfyUI skips loader nodes whose models are still cached, so time spent
+        in them is what a model swap cost.
+        """
+        entry = self.prompts.get(prompt_id)
+        if entry is not None and node_id in entry[0].loaders:
+            entry[0].load_seconds += seconds
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                while await self._dispatch_next():
+                    pass
+            except Exception as e:
+                logger.error(f"Error dispatching generations: {e}")
+
+    def _runs_on(self, job: DispatchJob, backend: ComfyUIBackend, backends: List[ComfyUIBackend]) -> bool:
+        """Whether a backend holds the job's checkpoint and has room for it in VRAM.
+
+        A condition no healthy backend meets is dropped, VRAM first.
+        """
+        def has_checkpoint(candidate):
+            return candidate.catalog.object_info is None or job.models[0] in candidate.catalog.checkpoints
+        def fits(candidate):
+            return candidate.fits(job.vram)
+        for checks in ((has_checkpoint, fits), (has_checkpoint,), (fits,)):
+            if any(all(check(candidate) for check in checks) for candidate in backends):
+                return all(check(backend) for check in checks)
+        return True
+
+    def _next(self, free: List[ComfyUIBackend], healthy: List[ComfyUIBackend]) -> Optional[tuple]:
+        """Choose the next job and the backend to send it to, serving higher priority lanes first"""
+        for rank in range(len(DISPATCH_PRIORITIES)):
+            jobs = [job for job in self.pending if job.rank == rank]
+            choice = self._next_in_lane(jobs, free, healthy) if jobs else None
+            if choice is not None:
+                return choice
+        return None
+
+    def _next_in_lane(self, jobs: List[DispatchJob], free: List[ComfyUIBackend], healthy: List[ComfyUIBackend]) -> Optional[tuple]:
+        budget = self.budget()
+        for job in jobs:
+            candidates = [backend for backend in free if self._runs_on(job, backend, healthy)]
+            if not candidates:
+                continue
+            # Jobs past their budget go first, in arrival order
+            if job.skips >= DISPATCH_MAX_SKIPS or job.waited() >= budget:
+                return job, min(candidates, key=lambda backend: (backend.lane.models != job.models, len(backend.lane.inflight)))
+        # The rest go shortest estimated job first; unestimated jobs keep arrival order behind them
+        estimates = {job.key: job.estimate() for job in jobs}
+        jobs = sorted(jobs, key=lambda job: (estimates[job.key] is None, estimates[job.key] or 0.0))
+        # Jobs that can reuse the models a backend has loaded come first
+        for backend in free:
+            for job in jobs:
+                if job.models == backend.lane.models and self._runs_on(job, backend, healthy):
+                    return job, backend
+        # Otherwise the next job goes to the least busy backend that can run it
+        for job in jobs:
+            candidates = [backend for backend in free if self._runs_on(job, backend, healthy)]
+            if candidates:
+                return job, min(candidates, key=lambda backend: (backend.lane.models is not None, len(backend.lane.inflight)))
+        return None
+
+    async def _dispatch_next(self) -> bool:
+        healthy = [backend for backend in backend_registry.all() if backend.healthy]
+        # A half-open breaker refuses calls while its trial is under way
+        free = [backend for backend in healthy if backend.lane.free > 0 and backend.breaker.ready()]
+        if not self.pending or not free:
+            return False
+        choice = self._next(free, healthy)
+        if choice is None:
+            return False
+        job, backend = choice
+        index = self.pending.index(job)
+        for skipped in self.pending[:index]:
+            skipped.skips += 1
+        if index:
+            backend.lane.pulled_forward += 1
+        del self.pending[index]
+        await self._send(job, backend)
+        return True
+
+    async def _send(self, job: DispatchJob, backend: ComfyUIBackend):
+        lane = backend.lane
+        # The slot is taken while the prompt is being queued
+        lane.inflight[job.key] = job
+        try:
+            prompt_id, client_id = await ComfyUIService.queue_prompt(job.workflow, backend)
+        finally:
+            del lane.inflight[job.key]
+        
+        if not prompt_id:
+            del self.jobs[job.key]
+            error_message = "Failed to queue prompt in ComfyUI"
+            await db.video_generations.update_many(
+                {"id": {"$in": job.video_ids}, "status": "queued"},
+                {"$set": {"status": "failed", "error_message": error_message}}
+            )
+            for video_id in job.video_ids:
+                progress_broker.publish(video_id, {"type": "failed", "status": "failed", "error_message": error_message})
+            return
+        
+        if lane.models is not None and lane.models != job.models:
+            lane.swaps += 1
+        lane.models = job.models
+        lane.dispatched += 1
+        lane.inflight[prompt_id] = job
+        job.prompt_id, job.backend, job.dispatched_at = prompt_id, backend.name, time.monotonic()
+        self.prompts[prompt_id] = (job, backend)
         
-        return workflow
+        if not job.video_ids:
+            # Every generation waiting on it was cancelled while it was being queued
+            await ComfyUIService.cancel_prompt(prompt_id, False, backend)
+            self.release(prompt_id)
+            return
+        for video_id in job.video_ids:
+            backend.listener.watch(prompt_id, video_id)
+        await db.video_generations.update_many(
+            {"id": {"$in": job.video_ids}, "status": "queued"},
+            {"$set": {"comfyui_prompt_id": prompt_id, "comfyui_backend": backend.name, "status": "processing"}}
+        )
+        for video_id in job.video_ids:
+            progress_broker.publish(video_id, {"type": "status", "status": "processing", "progress": 0.0})
+        await backend.listener.sync_prompt(prompt_id)
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(DISPATCH_RECONCILE_INTERVAL)
+            try:
+                await self._reconcile()
+            except Exception as e:
+                logger.error(f"Error reconciling dispatched prompts: {e}")
+            # Freed slots and unhealthy backends that recovered are picked up here
+            self._wake()
+
+    async def _reconcile(self):
+        """Release slots of prompts ComfyUI no longer holds, in case their events were missed"""
+        for backend in backend_registry.all():
+            stale = [
+                prompt_id for prompt_id, job in backend.lane.inflight.items()
+                if job.prompt_id == prompt_id and time.monotonic() - job.dispatched_at > DISPATCH_RECONCILE_INTERVAL
+            ]
+            if not stale or not await backend.queue.get():
+                continue
+            for prompt_id in stale:
+                if backend.queue.locate(prompt_id) is not None:
+                    continue
+                state = backend.listener.get_state(prompt_id)
+                if state is not None and state["status"] in ("completed", "failed"):
+                    await backend.listener.sync_prompt(prompt_id)
+                else:
+                    # No event reached us, e.g. it was queued under another client id
+                    await settle_prompt(prompt_id, backend)
+                self.release(prompt_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "lanes": {
+                priority: sum(1 for job in self.pending if job.rank == rank)
+                for rank, priority in enumerate(DISPATCH_PRIORITIES)
+            },
+            "max_backlog": DISPATCH_MAX_BACKLOG,
+            "drain_rate": self.drain_rate(),
+            "pending_generations": sum(len(job.video_ids) for job in self.pending),
+            "oldest_wait_seconds": self.pending[0].waited() if self.pending else None,
+            "budget_seconds": self.budget(),
+            "backends": {backend.name: backend.lane.to_dict() for backend in backend_registry.all()}
+        }
+
+dispatch_queue = DispatchQueue()
+
+class ArtifactStore:
+    """Content-addressed file store keyed by SHA-256 with byte-budgeted LRU eviction.
+
+    Files live at ``<root>/<sha[:2]>/<sha><ext>`` so identical outputs are
+    stored once however many generations reference them. Access times are
+    written back to disk so the LRU order survives restarts.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._index: "OrderedDict[str, Path]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+
+    async def load(self):
+        """Rebuild the index from disk, least recently used first"""
+        entries = await asyncio.to_thread(self._scan)
+        self._index.clear()
+        self._sizes.clear()
+        self.total_bytes = 0
+        for _, sha256, path, size in entries:
+            self._insert(sha256, path, size)
+        self._evict()
+        logger.info(f"Artifact store holds {len(self._index)} files ({self.total_bytes} bytes)")
+
+    def _scan(self):
+        entries = []
+        (self.root / "tmp").mkdir(parents=True, exist_ok=True)
+        for shard in self.root.iterdir():
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for path in shard.iterdir():
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.name.split(".", 1)[0], path, stat.st_size))
+        entries.sort()
+        return entries
+
+    def staging_path(self) -> Path:
+        """Temporary file to download into before calling add()"""
+        return self.root / "tmp" / f"{uuid.uuid4().hex}.part"
+
+    def add(self, staged: Path, sha256: str, size: int, suffix: str = "") -> Path:
+        """Move a staged file into the store, dropping it if the content is already held"""
+        path = self.get(sha256)
+        if path is not None:
+            staged.unlink(missing_ok=True)
+            return path
+        path = self.root / sha256[:2] / f"{sha256}{suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged, path)
+        self._insert(sha256, path, size)
+        self._evict(keep=sha256)
+        return path
+
+    def get(self, sha256: str) -> Optional[Path]:
+        """Path of a stored artifact, marking it as recently used"""
+        path = self._index.get(sha256)
+        if path is None:
+            return None
+        self._index.move_to_end(sha256)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._remove(sha256)
+            return None
+        return path
+
+    def _insert(self, sha256: str, path: Path, size: int):
+        self._index[sha256] = path
+        self._sizes[sha256] = size
+        self.total_bytes += size
+
+    def _remove(self, sha256: str):
+        self._index.pop(sha256, None)
+        self.total_bytes -= self._sizes.pop(sha256, 0)
+
+    def _evict(self, keep: Optional[str] = None):
+        while self.total_bytes > self.max_bytes and self._index:
+            sha256 = next(iter(self._index))
+            if sha256 == keep:
+                break
+            path = self._index[sha256]
+            self._remove(sha256)
+            path.unlink(missing_ok=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"files": len(self._index), "bytes": self.total_bytes, "max_bytes": self.max_bytes}
+
+artifact_store = ArtifactStore(ARTIFACTS_DIR, ARTIFACT_STORE_MAX_BYTES)
+
+def file_sha256(path: Path):
+    """SHA-256 and size of a file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(FRAME_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def encode_animated_webp(frame_paths: List[str], output_path: str, fps: int):
+    """Encode frames into an animated WebP (runs in a worker process)"""
+    from PIL import Image
+    frames = [Image.open(path) for path in frame_paths]
+    try:
+        frames[0].save(
+            output_path, format="WEBP", save_all=True, append_images=frames[1:],
+            duration=int(1000 / fps), loop=0
+        )
+    finally:
+        for frame in frames:
+            frame.close()
+
+def render_poster(frame_path: str, output_path: str, size: int):
+    """Downscale a frame into a WebP poster (runs in a worker process)"""
+    from PIL import Image
+    with Image.open(frame_path) as frame:
+        frame = frame.convert("RGB")
+        frame.thumbnail((size, size))
+        frame.save(output_path, format="WEBP", quality=80)
+
+def render_sprite(frame_paths: List[str], output_path: str, tile: int):
+    """Tile downscaled frames left to right into one WebP sheet (runs in a worker process)"""
+    from PIL import Image
+    sheet = None
+    for index, path in enumerate(frame_paths):
+        with Image.open(path) as frame:
+            frame = frame.convert("RGB")
+            frame.thumbnail((tile, tile))
+            if sheet is None:
+                sheet = Image.new("RGB", (frame.width * len(frame_paths), frame.height))
+            sheet.paste(frame, (index * sheet.width // len(frame_paths), 0))
+    sheet.save(output_path, format="WEBP", quality=75)
+
+VIDEO_CODECS = {
+    "mp4": ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+    "webm": ["-c:v", "libvpx-vp9", "-pix_fmt", "yuv420p", "-b:v", "0", "-crf", "32"]
+}
+VIDEO_CONTENT_TYPES = {"mp4": "video/mp4", "webm": "video/webm", "webp": "image/webp"}
+ENCODABLE_FRAME_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+class VideoEncodeJob:
+    """One encode in progress, fed frames in order as the harvester stores them.
+
+    The frame count may be left open and supplied later with close().
+    """
+
+    def __init__(self, assembler: "VideoAssembler", frame_count: Optional[int] = None):
+        self.assembler = assembler
+        self.frame_count = frame_count
+        self._frames: Dict[int, Path] = {}
+        self._ready = asyncio.Event()
+        self._output = assembler.store.staging_path()
+        self._task = asyncio.create_task(self._run())
+
+    def add_frame(self, index: int, path: Path):
+        self._frames[index] = path
+        self._ready.set()
+
+    def close(self, frame_count: int):
+        """Declare the total number of frames once it is known"""
+        self.frame_count = frame_count
+        self._ready.set()
+
+    async def finish(self) -> Dict[str, Any]:
+        """Wait for the encoded video and return its artifact entry"""
+        return await self._task
+
+    def abort(self):
+        self._task.cancel()
+
+    async def _next_frame(self, index: int) -> Optional[Path]:
+        """Wait for a frame; None once every frame has been consumed"""
+        while index not in self._frames:
+            if self.frame_count is not None and index >= self.frame_count:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames[index]
+
+    async def _frames_in_order(self):
+        index = 0
+        while (path := await self._next_frame(index)) is not None:
+            yield path
+            index += 1
+
+    async def _run(self) -> Dict[str, Any]:
+        try:
+            if self.assembler.ffmpeg:
+                video_format = self.assembler.video_format
+                await self._pipe_to_ffmpeg(video_format)
+            else:
+                video_format = "webp"
+                frames = [str(path) async for path in self._frames_in_order()]
+                await asyncio.get_running_loop().run_in_executor(
+                    self.assembler.pool(), encode_animated_webp, frames, str(self._output), self.assembler.fps
+                )
+            sha256, size = await asyncio.to_thread(file_sha256, self._output)
+        except BaseException:
+            self._output.unlink(missing_ok=True)
+            raise
+        self.assembler.store.add(self._output, sha256, size, f".{video_format}")
+        return {
+            "format": video_format,
+            "frames": self.frame_count,
+            "fps": self.assembler.fps,
+            "size": size,
+            "sha256": sha256,
+            "content_type": VIDEO_CONTENT_TYPES[video_format],
+            "url": f"/api/artifacts/{sha256}"
+        }
+
+    async def _pipe_to_ffmpeg(self, video_format: str):
+        process = await asyncio.create_subprocess_exec(
+            self.assembler.ffmpeg, "-y", "-loglevel", "error",
+            "-f", "image2pipe", "-framerate", str(self.assembler.fps), "-i", "-",
+            "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2", *VIDEO_CODECS[video_format],
+            "-f", video_format, str(self._output),
+            stdin=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            async for path in self._frames_in_order():
+                process.stdin.write(await asyncio.to_thread(path.read_bytes))
+                await process.stdin.drain()
+            process.stdin.close()
+            stderr = await process.stderr.read()
+            returncode = await process.wait()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with {returncode}: {stderr.decode(errors='replace').strip()}")
+
+class VideoAssembler:
+    """Builds a playable video from a prompt's harvested frames.
+
+    Frames are piped to ffmpeg in order while the rest are still downloading,
+    so the encode overlaps the harvest. Without ffmpeg an animated WebP is
+    built with Pillow in a process pool once every frame is on disk.
+    """
+
+    def __init__(self, store: ArtifactStore, video_format: str, fps: int, workers: int):
+        self.store = store
+        self.video_format = video_format
+        self.fps = fps
+        self.workers = workers
+        self.ffmpeg = shutil.which(FFMPEG_BINARY)
+        self._pool: Optional[ProcessPoolExecutor] = None
 
-    @staticmethod
-    async def queue_prompt(workflow):
-        """Queue a prompt in ComfyUI"""
+    def accepts(self, outputs: List[Dict[str, Any]]) -> bool:
+        """Whether outputs are a sequence of still frames worth encoding"""
+        return len(outputs) > 1 and self.encodable(outputs)
+
+    def encodable(self, outputs: List[Dict[str, Any]]) -> bool:
+        return all(Path(output["filename"]).suffix.lower() in ENCODABLE_FRAME_SUFFIXES for output in outputs)
+
+    def start(self, frame_count: Optional[int] = None) -> VideoEncodeJob:
+        return VideoEncodeJob(self, frame_count)
+
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned rather than forked so workers don't inherit open sockets
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+video_assembler = VideoAssembler(artifact_store, VIDEO_FORMAT, VIDEO_FPS, VIDEO_ENCODE_WORKERS)
+
+# Nodes whose saved files are harvested into local storage
+HARVEST_NODE_CLASSES = {"SaveImage", "SaveAnimatedWEBP", "SaveAnimatedPNG"}
+
+class OutputHarvester:
+    """Downloads a finished prompt's outputs from ComfyUI into the artifact store.
+
+    Runs once per prompt on completion: the files listed by /history are
+    fetched with bounded concurrency and a manifest with their sizes and
+    hashes is recorded on every generation attached to the prompt.
+    """
+
+    def __init__(self, store: ArtifactStore, concurrency: int):
+        self.store = store
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def schedule(self, prompt_id: str) -> asyncio.Task:
+        """Start harvesting a prompt unless it is already being harvested"""
+        task = self._tasks.get(prompt_id)
+        if task is None or task.done():
+            task = asyncio.create_task(self._harvest(prompt_id))
+            self._tasks[prompt_id] = task
+            task.add_done_callback(lambda _: self._tasks.pop(prompt_id, None))
+        return task
+
+    async def resume(self):
+        """Restart harvests interrupted by a shutdown"""
+        generations = await db.video_generations.find(
+            {"status": "completed", "comfyui_prompt_id": {"$ne": None}, "harvest_status": {"$in": ["pending", "running"]}},
+            {"comfyui_prompt_id": 1}
+        ).to_list(HARVEST_RESUME_LIMIT)
+        for prompt_id in {gen["comfyui_prompt_id"] for gen in generations}:
+            self.schedule(prompt_id)
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _harvest(self, prompt_id: str):
+        gen = await db.video_generations.find_one(
+            {"comfyui_prompt_id": prompt_id}, {"comfyui_backend": 1, "outputs": 1, "parent_id": 1}
+        )
+        if not gen:
+            return
+        backend = backend_registry.get(gen.get("comfyui_backend"))
+        query = {"comfyui_prompt_id": prompt_id, "status": "completed"}
+        await db.video_generations.update_many(query, {"$set": {"harvest_status": "running"}})
+        job = None
         try:
-            prompt_data = {
-                "prompt": workflow,
-                "client_id": str(uuid.uuid4())
-            }
+            history = await ComfyUIService.get_history(prompt_id, backend)
+            if history:
+                outputs = collect_output_images(history, HARVEST_NODE_CLASSES)
+            else:
+                outputs = gen.get("outputs") or []
+            if not outputs:
+                raise RuntimeError("ComfyUI reported no outputs")
+            
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.concurrency)
+            # Frames are encoded into a video while the rest still download;
+            # segments are encoded together by their parent instead
+            if video_assembler.accepts(outputs) and not gen.get("parent_id"):
+                job = video_assembler.start(len(outputs))
+            results = await asyncio.gather(
+                *(self._download(backend, index, output, job) for index, output in enumerate(outputs)),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            
+            video = None
+            if job is not None:
+                try:
+                    video = await job.finish()
+                except Exception as e:
+                    logger.error(f"Error encoding video for prompt {prompt_id}: {e}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{COMFYUI_BASE_URL}/prompt", json=prompt_data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get("prompt_id"), prompt_data["client_id"]
-                    else:
-                        return None, None
+            await db.video_generations.update_many(query, {"$set": {
+                "outputs": outputs,
+                "manifest": results,
+                "video": video,
+                "result_path": video["url"] if video else results[0]["url"],
+                "harvest_status": "done"
+            }})
+            logger.info(f"Harvested {len(results)} outputs for prompt {prompt_id}")
+            await self._announce(query, "done")
+        except asyncio.CancelledError:
+            if job is not None:
+                job.abort()
+            raise
         except Exception as e:
-            logger.error(f"Error queuing prompt: {e}")
-            return None, None
+            if job is not None:
+                job.abort()
+            logger.error(f"Error harvesting outputs for prompt {prompt_id}: {e}")
+            await db.video_generations.update_many(query, {"$set": {"harvest_status": "failed"}})
+            await self._announce(query, "failed")
 
     @staticmethod
-    async def get_queue_status():
-        """Get ComfyUI queue status"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{COMFYUI_BASE_URL}/queue") as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        return None
-        except Exception as e:
-            logger.error(f"Error getting queue status: {e}")
-            return None
+    async def _announce(query: Dict[str, Any], harvest_status: str):
+        generations = await db.video_generations.find(query, {"id": 1}).to_list(None)
+        for gen in generations:
+            progress_broker.publish(gen["id"], {"type": "harvested", "harvest_status": harvest_status})
 
-    @staticmethod
-    async def get_images(filename, subfolder="", folder_type="output"):
-        """Get generated images from ComfyUI"""
+    async def fetch(self, gen: Dict[str, Any], index: int) -> Path:
+        """Local path of a harvested frame, downloading it again if it was evicted"""
+        entry = gen["manifest"][index]
+        path = self.store.get(entry["sha256"])
+        if path is not None:
+            return path
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        backend = backend_registry.get(entry.get("comfyui_backend") or gen.get("comfyui_backend"))
+        await self._download(backend, index, entry, None)
+        return self.store.get(entry["sha256"])
+
+    async def _download(self, backend: ComfyUIBackend, index: int, output: Dict[str, Any],
+                        job: Optional[VideoEncodeJob]) -> Dict[str, Any]:
+        async with self._semaphore:
+            response = await ComfyUIService.open_view(output, backend=backend)
+            if response is None:
+                raise RuntimeError(f"ComfyUI unavailable while fetching {output['filename']}")
+            try:
+                if response.status != 200:
+                    raise RuntimeError(f"ComfyUI returned status {response.status} for {output['filename']}")
+                staged = self.store.staging_path()
+                digest = hashlib.sha256()
+                size = 0
+                with open(staged, "wb") as f:
+                    async for chunk in response.content.iter_chunked(FRAME_CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                content_type = response.headers.get("Content-Type")
+            except BaseException:
+                staged.unlink(missing_ok=True)
+                raise
+            finally:
+                response.release()
+        sha256 = digest.hexdigest()
+        path = self.store.add(staged, sha256, size, Path(output["filename"]).suffix)
+        if job is not None:
+            job.add_frame(index, path)
+        return {
+            "filename": output["filename"],
+            "subfolder": output.get("subfolder", ""),
+            "type": output.get("type", "output"),
+            "node_id": output.get("node_id"),
+            "size": size,
+            "sha256": sha256,
+            "content_type": content_type,
+            "url": f"/api/artifacts/{sha256}"
+        }
+
+output_harvester = OutputHarvester(artifact_store, HARVEST_CONCURRENCY)
+
+class SegmentedRender:
+    """Aggregates the segments of one long generation and stitches their frames.
+
+    Segment progress is averaged into the parent, and each segment's frames
+    are handed to the encoder as soon as that segment is harvested, so the
+    encode overlaps the segments still rendering.
+    """
+
+    def __init__(self, parent_id: str, segment_ids: List[str]):
+        self.parent_id = parent_id
+        self.segment_ids = segment_ids
+        self.segment_progress = {video_id: 0.0 for video_id in segment_ids}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        for video_id in segment_ids:
+            progress_broker.subscribe(video_id, self._queue)
+        self.task = asyncio.create_task(self._run())
+
+    @property
+    def progress(self) -> float:
+        return sum(self.segment_progress.values()) / len(self.segment_progress)
+
+    async def _run(self):
+        job = None
+        harvested: Dict[int, Dict[str, Any]] = {}
+        fed = frame_count = 0
         try:
-            params = {
-                "filename": filename,
-                "subfolder": subfolder,
-                "type": folder_type
-            }
+            # Segments that finished before this render started are read from the database
+            changed = set(self.segment_ids)
+            while True:
+                for video_id in changed:
+                    gen = await db.video_generations.find_one({"id": video_id})
+                    if gen["status"] in ("failed", "cancelled"):
+                        reason = f": {gen['error_message']}" if gen.get("error_message") else ""
+                        raise RuntimeError(f"Segment {gen['segment_index']} {gen['status']}{reason}")
+                    if gen.get("harvest_status") == "failed":
+                        raise RuntimeError(f"Segment {gen['segment_index']} outputs could not be harvested")
+                    if gen.get("harvest_status") == "done":
+                        harvested[gen["segment_index"]] = gen
+                        self.segment_progress[video_id] = 1.0
+                
+                # Feed harvested segments to the encoder in order
+                while fed in harvested:
+                    gen = harvested[fed]
+                    if fed == 0 and video_assembler.encodable(gen["manifest"]):
+                        job = video_assembler.start()
+                    if job is not None:
+                        for index in range(len(gen["manifest"])):
+                            job.add_frame(frame_count + index, await output_harvester.fetch(gen, index))
+                    frame_count += len(gen["manifest"])
+                    fed += 1
+                if fed == len(self.segment_ids):
+                    break
+                
+                event = await self._queue.get()
+                if event.get("progress") is not None:
+                    self.segment_progress[event["video_id"]] = event["progress"]
+                    progress_broker.publish(self.parent_id, {"type": "progress", "status": "processing", "progress": self.progress})
+                changed = {event["video_id"]} if event["type"] in ("harvested", "failed", "cancelled") else set()
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{COMFYUI_BASE_URL}/view", params=params) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        return base64.b64encode(image_data).decode('utf-8')
-                    else:
-                        return None
+            segments = [harvested[index] for index in range(len(self.segment_ids))]
+            manifest = [
+                {**entry, "comfyui_backend": gen.get("comfyui_backend")}
+                for gen in segments for entry in gen["manifest"]
+            ]
+            video = None
+            if job is not None:
+                job.close(frame_count)
+                try:
+                    video = await job.finish()
+                except Exception as e:
+                    logger.error(f"Error encoding video for {self.parent_id}: {e}")
+                job = None
+            
+            await db.video_generations.update_one({"id": self.parent_id, "status": "processing"}, {"$set": {
+                "status": "completed",
+                "completed_at": datetime.utcnow(),
+                "progress": 1.0,
+                "outputs": [output for gen in segments for output in gen.get("outputs") or []],
+                "manifest": manifest,
+                "video": video,
+                "result_path": video["url"] if video else manifest[0]["url"],
+                "harvest_status": "done"
+            }})
+            progress_broker.publish(self.parent_id, {"type": "completed", "status": "completed", "progress": 1.0})
+        except asyncio.CancelledError:
+            if job is not None:
+                job.abort()
+            raise
         except Exception as e:
-            logger.error(f"Error getting images: {e}")
+            if job is not None:
+                job.abort()
+            # A parent cancelled by the user is already terminal and stays cancelled
+            result = await db.video_generations.update_one(
+                {"id": self.parent_id, "status": "processing"},
+                {"$set": {"status": "failed", "error_message": str(e), "completed_at": datetime.utcnow()}}
+            )
+            if result.modified_count:
+                logger.error(f"Segmented generation {self.parent_id} failed: {e}")
+                progress_broker.publish(self.parent_id, {"type": "failed", "status": "failed", "error_message": str(e)})
+                await cancel_segments(self.parent_id)
+        finally:
+            for video_id in self.segment_ids:
+                progress_broker.unsubscribe(video_id, self._queue)
+
+class SegmentCoordinator:
+    """Runs the SegmentedRender of every segmented generation in progress"""
+
+    def __init__(self):
+        self._renders: Dict[str, SegmentedRender] = {}
+
+    def start(self, parent_id: str, segment_ids: List[str]) -> SegmentedRender:
+        render = SegmentedRender(parent_id, segment_ids)
+        self._renders[parent_id] = render
+        render.task.add_done_callback(lambda _: self._renders.pop(parent_id, None))
+        return render
+
+    def get(self, parent_id: str) -> Optional[SegmentedRender]:
+        return self._renders.get(parent_id)
+
+    async def resume(self):
+        """Pick up segmented generations left processing by a shutdown"""
+        parents = await db.video_generations.find(
+            {"status": "processing", "segment_count": {"$ne": None}}, {"id": 1}
+        ).to_list(None)
+        for parent in parents:
+            segments = await db.video_generations.find(
+                {"parent_id": parent["id"]}, {"id": 1}
+            ).sort("segment_index", 1).to_list(None)
+            if segments:
+                self.start(parent["id"], [segment["id"] for segment in segments])
+
+    async def stop(self):
+        tasks = [render.task for render in self._renders.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+segment_renders = SegmentCoordinator()
+
+class PreviewRenderer:
+    """Builds poster and sprite-sheet previews of harvested generations on demand.
+
+    Previews are rendered in the worker pool the first time they are asked
+    for, stored in the artifact store (and evicted with it) and remembered
+    on the generation record by hash.
+    """
+
+    def __init__(self, store: ArtifactStore, poster_size: int, sprite_frames: int, sprite_tile: int):
+        self.store = store
+        self.poster_size = poster_size
+        self.sprite_frames = sprite_frames
+        self.sprite_tile = sprite_tile
+        self._pending: Dict[tuple, asyncio.Task] = {}
+
+    def urls(self, gen: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Preview URLs for a history item, if the generation has frames"""
+        if not gen.get("manifest"):
             return None
+        return {
+            "poster": f"/api/generate/{gen['id']}/poster",
+            "sprite": f"/api/generate/{gen['id']}/sprite",
+            "sprite_frames": len(self.sprite_indices(len(gen["manifest"])))
+        }
+
+    def sprite_indices(self, frame_count: int) -> List[int]:
+        """Evenly spaced frames shown in the sprite sheet"""
+        count = min(frame_count, self.sprite_frames)
+        return [index * frame_count // count for index in range(count)]
+
+    async def get(self, gen: Dict[str, Any], kind: str) -> Path:
+        """Path of a preview, rendering it if it is missing"""
+        sha256 = (gen.get("preview_artifacts") or {}).get(kind)
+        path = self.store.get(sha256) if sha256 else None
+        if path is not None:
+            return path
+        
+        key = (gen["id"], kind)
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._render(gen, kind))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _render(self, gen: Dict[str, Any], kind: str) -> Path:
+        manifest = gen["manifest"]
+        if kind == "poster":
+            indices = [len(manifest) // 2]
+        else:
+            indices = self.sprite_indices(len(manifest))
+        frames = [str(await output_harvester.fetch(gen, index)) for index in indices]
+        
+        staged = self.store.staging_path()
+        try:
+            loop = asyncio.get_running_loop()
+            if kind == "poster":
+                await loop.run_in_executor(video_assembler.pool(), render_poster, frames[0], str(staged), self.poster_size)
+            else:
+                await loop.run_in_executor(video_assembler.pool(), render_sprite, frames, str(staged), self.sprite_tile)
+            sha256, size = await asyncio.to_thread(file_sha256, staged)
+        except BaseException:
+            staged.unlink(missing_ok=True)
+            raise
+        path = self.store.add(staged, sha256, size, ".webp")
+        await db.video_generations.update_one({"id": gen["id"]}, {"$set": {f"preview_artifacts.{kind}": sha256}})
+        return path
+
+preview_renderer = PreviewRenderer(artifact_store, PREVIEW_POSTER_SIZE, PREVIEW_SPRITE_FRAMES, PREVIEW_SPRITE_TILE)
 
 # API Routes
 @api_router.get("/")
@@ -323,7 +2915,8 @@ async def get_comfyui_config():
     """Get current ComfyUI configuration"""
     return {
         "base_url": COMFYUI_BASE_URL,
-        "ws_url": COMFYUI_WS_URL
+        "ws_url": COMFYUI_WS_URL,
+        "backends": [backend.to_dict() for backend in backend_registry.all()]
     }
 
 @api_router.post("/comfyui/config")
@@ -333,7 +2926,8 @@ async def set_comfyui_config(config: dict):
     
     if 'base_url' in config:
         COMFYUI_BASE_URL = config['base_url']
-        COMFYUI_WS_URL = config['base_url'].replace('http://', 'ws://').replace('https://', 'wss://') + '/ws'
+        COMFYUI_WS_URL = websocket_url(config['base_url'])
+        backend_registry.reconfigure_primary(COMFYUI_BASE_URL, COMFYUI_WS_URL)
     
     return {
         "success": True,
@@ -343,22 +2937,18 @@ async def set_comfyui_config(config: dict):
 
 @api_router.get("/comfyui/status")
 async def get_comfyui_status():
-    """Check ComfyUI connection status"""
-    try:
-        timeout = aiohttp.ClientTimeout(total=5)  # 5 second timeout
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(f"{COMFYUI_BASE_URL}/system_stats") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return {"status": "connected", "data": data}
-                else:
-                    return {"status": "disconnected", "error": f"HTTP {response.status}"}
-    except asyncio.TimeoutError:
-        return {"status": "error", "message": "Connection timeout"}
-    except aiohttp.ClientConnectorError as e:
-        return {"status": "error", "message": f"Connection refused: {str(e)}"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    """Report ComfyUI connection status from the background health probe"""
+    backends = backend_registry.all()
+    status = dict(backends[0].health)
+    if status["status"] != "connected" and any(backend.health["status"] == "connected" for backend in backends):
+        status["status"] = "connected"
+    status["backends"] = [
+        {"name": backend.name, "base_url": backend.base_url, "circuit": backend.breaker.state,
+         "vram_capacity": backend.vram_capacity, **backend.health}
+        for backend in backends
+    ]
+    status["artifacts"] = artifact_store.to_dict()
+    return status
 
 @api_router.get("/comfyui/debug")
 async def debug_comfyui_connection():
@@ -371,18 +2961,17 @@ async def debug_comfyui_connection():
     
     # Test 1: Basic connection
     try:
-        timeout = aiohttp.ClientTimeout(total=5)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            start_time = datetime.utcnow()
-            async with session.get(f"{COMFYUI_BASE_URL}/") as response:
-                end_time = datetime.utcnow()
-                debug_info["tests"].append({
-                    "test": "Basic connection",
-                    "success": True,
-                    "status": response.status,
-                    "response_time": str(end_time - start_time),
-                    "headers": dict(response.headers)
-                })
+        session = get_http_session()
+        start_time = datetime.utcnow()
+        async with session.get(f"{COMFYUI_BASE_URL}/", timeout=COMFYUI_TIMEOUTS["system_stats"]) as response:
+            end_time = datetime.utcnow()
+            debug_info["tests"].append({
+                "test": "Basic connection",
+                "success": True,
+                "status": response.status,
+                "response_time": str(end_time - start_time),
+                "headers": dict(response.headers)
+            })
     except Exception as e:
         debug_info["tests"].append({
             "test": "Basic connection",
@@ -393,27 +2982,26 @@ async def debug_comfyui_connection():
     
     # Test 2: System stats
     try:
-        timeout = aiohttp.ClientTimeout(total=5)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            start_time = datetime.utcnow()
-            async with session.get(f"{COMFYUI_BASE_URL}/system_stats") as response:
-                end_time = datetime.utcnow()
-                if response.status == 200:
-                    data = await response.json()
-                    debug_info["tests"].append({
-                        "test": "System stats",
-                        "success": True,
-                        "status": response.status,
-                        "response_time": str(end_time - start_time),
-                        "data_preview": str(data)[:200] + "..." if len(str(data)) > 200 else str(data)
-                    })
-                else:
-                    debug_info["tests"].append({
-                        "test": "System stats",
-                        "success": False,
-                        "status": response.status,
-                        "response_time": str(end_time - start_time)
-                    })
+        session = get_http_session()
+        start_time = datetime.utcnow()
+        async with session.get(f"{COMFYUI_BASE_URL}/system_stats", timeout=COMFYUI_TIMEOUTS["system_stats"]) as response:
+            end_time = datetime.utcnow()
+            if response.status == 200:
+                data = await response.json()
+                debug_info["tests"].append({
+                    "test": "System stats",
+                    "success": True,
+                    "status": response.status,
+                    "response_time": str(end_time - start_time),
+                    "data_preview": str(data)[:200] + "..." if len(str(data)) > 200 else str(data)
+                })
+            else:
+                debug_info["tests"].append({
+                    "test": "System stats",
+                    "success": False,
+                    "status": response.status,
+                    "response_time": str(end_time - start_time)
+                })
     except Exception as e:
         debug_info["tests"].append({
             "test": "System stats",
@@ -424,6 +3012,16 @@ async def debug_comfyui_connection():
     
     return debug_info
 
+@api_router.get("/comfyui/dispatch")
+async def get_dispatch_stats():
+    """Dispatch queue backlog and per-backend model swap statistics"""
+    return dispatch_queue.to_dict()
+
+@api_router.get("/comfyui/estimator")
+async def get_runtime_estimator():
+    """Fitted render time coefficients, per checkpoint and overall"""
+    return runtime_estimator.to_dict()
+
 @api_router.get("/comfyui/checkpoints")
 async def get_checkpoints():
     """Get available checkpoints"""
@@ -436,56 +3034,549 @@ async def get_loras():
     loras = await ComfyUIService.get_available_loras()
     return {"loras": loras}
 
+@api_router.get("/comfyui/templates")
+async def get_workflow_templates():
+    """List the loaded workflow templates and their parameter slots"""
+    return {"templates": [template.to_dict() for template in workflow_templates.all()]}
+
+async def find_cached_result(workflow_hash: str) -> Optional[Dict[str, Any]]:
+    """Newest completed generation of the same workflow whose result is still stored"""
+    source = await db.video_generations.find_one(
+        {"workflow_hash": workflow_hash, "status": "completed", "harvest_status": "done"},
+        sort=[("created_at", -1)]
+    )
+    if not source or not result_stored(source):
+        return None
+    return source
+
+def result_stored(source: Dict[str, Any]) -> bool:
+    result = source.get("video") or source["manifest"][0]
+    return artifact_store.get(result["sha256"]) is not None
+
+def cached_record(video_gen: VideoGeneration, source: Dict[str, Any]) -> Dict[str, Any]:
+    """Completed record for a generation that reuses another one's result"""
+    record = video_gen.dict()
+    record.update({field: source[field] for field in CACHED_RESULT_FIELDS if field in source})
+    record.update({
+        "status": "completed",
+        "completed_at": datetime.utcnow(),
+        "progress": 1.0,
+        "cached_from": source["id"]
+    })
+    return record
+
+CACHED_RESULT_FIELDS = (
+    "comfyui_prompt_id", "comfyui_backend", "outputs", "manifest", "video",
+    "result_path", "harvest_status", "preview_artifacts"
+)
+
+async def submit_generation(video_gen: VideoGeneration, workflow, shareable: bool = True) -> Dict[str, Any]:
+    """Record a generation and hand its workflow to the dispatch queue"""
+    if not any(backend.healthy for backend in backend_registry.all()):
+        await db.video_generations.insert_one(
+            {**video_gen.dict(), "status": "failed", "error_message": "No ComfyUI backend available"}
+        )
+        raise HTTPException(status_code=503, detail="No ComfyUI backend available")
+    
+    # Save to database
+    await db.video_generations.insert_one({**video_gen.dict(), "status": "queued"})
+    
+    job = dispatch_queue.enqueue(video_gen, workflow, shareable)
+    if job.prompt_id is not None:
+        # An identical workflow is already running
+        return await attach_generation(video_gen, job.prompt_id, job.backend, inserted=True)
+    progress_broker.publish(video_gen.id, {"type": "status", "status": "queued", "progress": 0.0})
+    return {
+        "success": True,
+        "video_id": video_gen.id,
+        "prompt_id": None,
+        "backend": None,
+        "status": "queued",
+        "deduplicated": len(job.video_ids) > 1,
+        "message": "Video generation queued"
+    }
+
+async def attach_generation(video_gen: VideoGeneration, prompt_id: str, backend_name: Optional[str],
+                            inserted: bool = False) -> Dict[str, Any]:
+    """Record a generation that shares an identical prompt already running in ComfyUI"""
+    backend = backend_registry.get(backend_name)
+    fields = {"comfyui_prompt_id": prompt_id, "comfyui_backend": backend.name, "status": "processing"}
+    if inserted:
+        await db.video_generations.update_one({"id": video_gen.id}, {"$set": fields})
+    else:
+        await db.video_generations.insert_one({**video_gen.dict(), **fields})
+    backend.listener.watch(prompt_id, video_gen.id)
+    state = backend.listener.get_state(prompt_id)
+    progress = state["progress"] if state is not None else 0.0
+    progress_broker.publish(video_gen.id, {"type": "status", "status": "processing", "progress": progress})
+    # The shared prompt may have finished while this record was written
+    await backend.listener.sync_prompt(prompt_id)
+    return {
+        "success": True,
+        "video_id": video_gen.id,
+        "prompt_id": prompt_id,
+        "backend": backend.name,
+        "status": "processing",
+        "deduplicated": True,
+        "message": "Attached to an identical generation in progress"
+    }
+
+def with_priority(request: VideoGenerationRequest, default: str) -> VideoGenerationRequest:
+    """Request with its dispatch priority resolved"""
+    priority = request.priority or default
+    if priority not in DISPATCH_PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown priority '{priority}'")
+    return request.copy(update={"priority": priority})
+
+def largest_vram_capacity() -> Optional[int]:
+    """VRAM a prompt can use on the roomiest healthy backend, after headroom"""
+    capacities = [
+        backend.vram_capacity - int(VRAM_RESERVE_GB * GIB)
+        for backend in backend_registry.all() if backend.healthy and backend.vram_capacity is not None
+    ]
+    return max(capacities) if capacities else None
+
+def vram_frame_limit(request: VideoGenerationRequest) -> Optional[int]:
+    """Most frames one prompt of the request can render on the roomiest backend.
+
+    None when the whole request fits or no backend reports VRAM, 0 when not
+    even a single frame fits.
+    """
+    capacity = largest_vram_capacity()
+    frames = ComfyUIService.frame_count(request)
+    if capacity is None or vram_required(request, frames) <= capacity:
+        return None
+    low, high = 0, frames
+    while low < high:
+        middle = (low + high + 1) // 2
+        if vram_required(request, middle) <= capacity:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def segment_frames(request: VideoGenerationRequest) -> int:
+    """Frames per segment prompt, lowered below SEGMENT_FRAMES when VRAM requires it"""
+    limit = vram_frame_limit(request)
+    return min(SEGMENT_FRAMES, limit) if limit else SEGMENT_FRAMES
+
+def check_vram(request: VideoGenerationRequest) -> List[str]:
+    """Errors for a request that does not fit any backend even one frame at a time"""
+    if vram_frame_limit(request) != 0:
+        return []
+    return [
+        f"One {request.width}x{request.height} frame of {request.checkpoint} needs about "
+        f"{vram_required(request, 1) / GIB:.1f} GiB of VRAM, the largest backend has "
+        f"{largest_vram_capacity() / GIB:.1f} GiB available"
+    ]
+
+async def validate_request(request: VideoGenerationRequest) -> List[str]:
+    """Validate a request's workflow against the cached node schemas of the backends.
+
+    The workflow only has to be valid for one backend, since dispatch prefers
+    the backends holding the checkpoint. Without any cached schema ComfyUI is
+    left to validate it.
+    """
+    try:
+        workflow = orjson.loads(await ComfyUIService.create_video_workflow(request))
+    except ValueError as e:
+        # The template cannot express the request, e.g. a LoRA without a lora block
+        return [str(e)]
+    errors: List[str] = []
+    for catalog in await backend_registry.get_catalogs():
+        if catalog.object_info is None:
+            continue
+        backend_errors = validate_workflow(workflow, catalog.object_info)
+        if not backend_errors:
+            return []
+        errors = errors or backend_errors
+    return errors
+
+async def start_generation(request: VideoGenerationRequest, admitted: bool = False, **fields) -> Dict[str, Any]:
+    """Create a generation, reusing or sharing identical work unless use_cache is off.
+
+    New work must fit the dispatch backlog unless the caller already admitted it.
+    """
+    # Create workflow
+    workflow = await ComfyUIService.create_video_workflow(request)
+    
+    # Create video generation record
+    video_gen = VideoGeneration(**request.dict(), workflow_hash=workflow_hash(workflow), **fields)
+    video_gen.estimated_seconds = runtime_estimator.predict(video_gen.checkpoint, render_work(video_gen))
+    
+    # Identical workflows render identical outputs, so reuse a finished one
+    source = await find_cached_result(video_gen.workflow_hash) if request.use_cache else None
+    if source is not None:
+        record = cached_record(video_gen, source)
+        await db.video_generations.insert_one(record)
+        progress_broker.publish(video_gen.id, {"type": "completed", "status": "completed", "progress": 1.0})
+        return {
+            "success": True,
+            "video_id": video_gen.id,
+            "prompt_id": record.get("comfyui_prompt_id"),
+            "backend": record.get("comfyui_backend"),
+            "cached": True,
+            "message": "Reused the result of an identical generation"
+        }
+    
+    # Identical workflows share one ComfyUI prompt; the dispatch queue tracks the ones it
+    # holds, prompts queued before a restart are only known from their records
+    if request.use_cache and video_gen.workflow_hash not in dispatch_queue.jobs:
+        source = await db.video_generations.find_one(
+            {"workflow_hash": video_gen.workflow_hash, "status": "processing", "comfyui_prompt_id": {"$ne": None}},
+            {"comfyui_prompt_id": 1, "comfyui_backend": 1}
+        )
+        if source is not None:
+            return await attach_generation(video_gen, source["comfyui_prompt_id"], source.get("comfyui_backend"))
+    if not admitted and not (request.use_cache and video_gen.workflow_hash in dispatch_queue.jobs):
+        dispatch_queue.admit(video_gen.priority)
+    return await submit_generation(video_gen, workflow, shareable=request.use_cache)
+
+async def start_segmented_generation(request: VideoGenerationRequest, admitted: bool = False, **fields) -> Dict[str, Any]:
+    """Split a long generation into fixed-size segment prompts under one parent record"""
+    frames = ComfyUIService.frame_count(request)
+    base_seed = request.seed if request.seed is not None else DEFAULT_SEED
+    size = segment_frames(request)
+    windows = [min(size, frames - start) for start in range(0, frames, size)]
+    if not admitted:
+        dispatch_queue.admit(request.priority, len(windows))
+    parent = VideoGeneration(**request.dict(), status="processing", progress=0.0, segment_count=len(windows), **fields)
+    parent.estimated_seconds = runtime_estimator.predict(parent.checkpoint, render_work(parent))
+    await db.video_generations.insert_one(parent.dict())
+    
+    # Each segment is an ordinary generation, so it is dispatched, cached and deduplicated on its own
+    segments = []
+    try:
+        for index, window in enumerate(windows):
+            segment = request.copy(update={"frames": window, "seed": base_seed + index})
+            segments.append(await start_generation(segment, admitted=True, parent_id=parent.id, segment_index=index))
+    except Exception as e:
+        message = e.detail if isinstance(e, HTTPException) else str(e)
+        await db.video_generations.update_one(
+            {"id": parent.id},
+            {"$set": {"status": "failed", "error_message": f"Segment {len(segments)} failed: {message}"}}
+        )
+        progress_broker.publish(parent.id, {"type": "failed", "status": "failed", "error_message": message})
+        await cancel_segments(parent.id)
+        raise
+    
+    segment_renders.start(parent.id, [segment["video_id"] for segment in segments])
+    progress_broker.publish(parent.id, {"type": "status", "status": "processing", "progress": 0.0})
+    return {
+        "success": True,
+        "video_id": parent.id,
+        "prompt_id": None,
+        "segments": [
+            {key: segment.get(key) for key in ("video_id", "prompt_id", "backend")}
+            for segment in segments
+        ],
+        "message": f"Video generation started in {len(segments)} segments"
+    }
+
 @api_router.post("/generate/video")
 async def generate_video(request: VideoGenerationRequest):
     """Generate video using ComfyUI"""
+    request = with_priority(request, "normal")
+    if workflow_templates.get(request.workflow_template) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown workflow template '{request.workflow_template}'")
+    errors = await validate_request(request)
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "Workflow failed validation", "errors": errors})
+    errors = check_vram(request)
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "Request does not fit in GPU memory", "errors": errors})
     try:
-        # Create video generation record
-        video_gen = VideoGeneration(
-            prompt=request.prompt,
-            checkpoint=request.checkpoint,
-            lora=request.lora,
-            width=request.width,
-            height=request.height,
-            frames=request.frames,
-            duration_type=request.duration_type
-        )
-        
-        # Save to database
-        await db.video_generations.insert_one(video_gen.dict())
-        
-        # Create workflow
-        workflow = await ComfyUIService.create_video_workflow(request)
-        
-        # Queue prompt
-        prompt_id, client_id = await ComfyUIService.queue_prompt(workflow)
-        
-        if prompt_id:
-            # Update record with prompt_id
-            await db.video_generations.update_one(
-                {"id": video_gen.id},
-                {"$set": {"comfyui_prompt_id": prompt_id, "status": "processing"}}
-            )
-            
-            return {
-                "success": True,
-                "video_id": video_gen.id,
-                "prompt_id": prompt_id,
-                "message": "Video generation started"
-            }
-        else:
-            # Update record with error
-            await db.video_generations.update_one(
-                {"id": video_gen.id},
-                {"$set": {"status": "failed", "error_message": "Failed to queue prompt"}}
-            )
-            
-            raise HTTPException(status_code=500, detail="Failed to queue prompt in ComfyUI")
-            
+        # Long renders, and ones too large for any backend's VRAM, are split into segments
+        if ComfyUIService.frame_count(request) > segment_frames(request):
+            return await start_segmented_generation(request)
+        return await start_generation(request)
+    except HTTPException:
+        raise  # Re-raise HTTPException as-is
     except Exception as e:
         logger.error(f"Error generating video: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def start_batch(requests: List[VideoGenerationRequest], batch_id: str) -> List[Dict[str, Any]]:
+    """Record a batch with one insert_many and hand its unique workflows to the dispatch queue.
+
+    Records that reuse a finished result or join a running prompt are settled
+    up front, and the ones joining a prompt are updated with one bulk_write.
+    """
+    items: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+    records: Dict[int, Dict[str, Any]] = {}
+    workflows: Dict[str, Any] = {}
+    groups: Dict[str, List[int]] = {}  # share key -> indexes sharing one prompt
+    
+    if not any(backend.healthy for backend in backend_registry.all()):
+        raise HTTPException(status_code=503, detail="No ComfyUI backend available")
+    
+    sizes = [segment_frames(request) for request in requests]
+    for index, request in enumerate(requests):
+        if ComfyUIService.frame_count(request) > sizes[index]:
+            continue
+        workflow = await ComfyUIService.create_video_workflow(request)
+        video_gen = VideoGeneration(**request.dict(), workflow_hash=workflow_hash(workflow), batch_id=batch_id, status="queued")
+        video_gen.estimated_seconds = runtime_estimator.predict(video_gen.checkpoint, render_work(video_gen))
+        records[index] = video_gen.dict()
+        key = video_gen.workflow_hash if request.use_cache else video_gen.id
+        workflows[key] = workflow
+        groups.setdefault(key, []).append(index)
+    
+    # Reuse finished results and attach to identical prompts already running
+    hashes = [key for key, indexes in groups.items() if requests[indexes[0]].use_cache]
+    sources = await db.video_generations.find(
+        {"workflow_hash": {"$in": hashes}, "status": "completed", "harvest_status": "done"}
+    ).sort("created_at", -1).to_list(None)
+    cached: Dict[str, Dict[str, Any]] = {}
+    for source in sources:
+        if source["workflow_hash"] not in cached and result_stored(source):
+            cached[source["workflow_hash"]] = source
+    running = await db.video_generations.find(
+        {"workflow_hash": {"$in": [key for key in hashes if key not in dispatch_queue.jobs]},
+         "status": "processing", "comfyui_prompt_id": {"$ne": None}},
+        {"workflow_hash": 1, "comfyui_prompt_id": 1, "comfyui_backend": 1}
+    ).to_list(None)
+    shared: Dict[str, tuple] = {gen["workflow_hash"]: (gen["comfyui_prompt_id"], gen.get("comfyui_backend")) for gen in running}
+    
+    # The whole batch is admitted or turned away before anything is recorded
+    new_jobs = {priority: 0 for priority in DISPATCH_PRIORITIES}
+    for key, indexes in groups.items():
+        if key not in cached and key not in shared and key not in dispatch_queue.jobs:
+            new_jobs[requests[indexes[0]].priority] += 1
+    for index, request in enumerate(requests):
+        if ComfyUIService.frame_count(request) > sizes[index]:
+            new_jobs[request.priority] += math.ceil(ComfyUIService.frame_count(request) / sizes[index])
+    for rank, priority in enumerate(DISPATCH_PRIORITIES):
+        jobs = sum(new_jobs[higher] for higher in DISPATCH_PRIORITIES[:rank + 1])
+        if new_jobs[priority]:
+            dispatch_queue.admit(priority, jobs)
+    
+    for key, indexes in groups.items():
+        for index in indexes:
+            if key in cached:
+                records[index] = cached_record(VideoGeneration(**records[index]), cached[key])
+            elif key in shared:
+                prompt_id, backend_name = shared[key]
+                records[index].update({
+                    "comfyui_prompt_id": prompt_id,
+                    "comfyui_backend": backend_registry.get(backend_name).name,
+                    "status": "processing"
+                })
+    if records:
+        await db.video_generations.insert_many(list(records.values()))
+    
+    # The rest wait in the dispatch queue, unless an identical prompt got dispatched meanwhile
+    operations = []
+    joined: Set[str] = set()  # keys that joined a job queued by an earlier submission
+    for key, indexes in groups.items():
+        if key in cached or key in shared:
+            continue
+        for index in indexes:
+            job = dispatch_queue.enqueue(VideoGeneration(**records[index]), workflows[key], requests[index].use_cache)
+        if job.prompt_id is not None:
+            shared[key] = (job.prompt_id, job.backend)
+            operations.append(UpdateMany(
+                {"id": {"$in": [records[index]["id"] for index in indexes]}},
+                {"$set": {"comfyui_prompt_id": job.prompt_id, "comfyui_backend": job.backend, "status": "processing"}}
+            ))
+        elif len(job.video_ids) > len(indexes):
+            joined.add(key)
+    if operations:
+        await db.video_generations.bulk_write(operations, ordered=False)
+    
+    for key, indexes in groups.items():
+        prompt = shared.get(key)
+        for index in indexes:
+            video_id = records[index]["id"]
+            item = {"video_id": video_id, "prompt_id": None, "backend": None}
+            if key in cached:
+                record = records[index]
+                item.update(status="completed", cached=True, prompt_id=record.get("comfyui_prompt_id"), backend=record.get("comfyui_backend"))
+                progress_broker.publish(video_id, {"type": "completed", "status": "completed", "progress": 1.0})
+            elif prompt is not None:
+                backend = backend_registry.get(prompt[1])
+                backend.listener.watch(prompt[0], video_id)
+                item.update(status="processing", prompt_id=prompt[0], backend=backend.name, deduplicated=True)
+                progress_broker.publish(video_id, {"type": "status", "status": "processing", "progress": 0.0})
+            else:
+                item["status"] = "queued"
+                if key in joined or index != indexes[0]:
+                    item["deduplicated"] = True
+                progress_broker.publish(video_id, {"type": "status", "status": "queued", "progress": 0.0})
+            items[index] = item
+        if prompt is not None:
+            # The prompt may have finished before its records were updated
+            await backend_registry.get(prompt[1]).listener.sync_prompt(prompt[0])
+    
+    # Long requests keep their own segmented flow
+    for index, request in enumerate(requests):
+        if items[index] is not None:
+            continue
+        try:
+            response = await start_segmented_generation(request, admitted=True, batch_id=batch_id)
+            items[index] = {"video_id": response["video_id"], "status": "processing", "prompt_id": None,
+                            "backend": None, "segments": len(response["segments"])}
+        except HTTPException as e:
+            items[index] = {"video_id": None, "status": "failed", "error": e.detail}
+    return items
+
+@api_router.post("/generate/batch")
+async def generate_batch(batch: BatchGenerationRequest):
+    """Submit many generations in one call"""
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(batch.requests) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {BATCH_MAX_SIZE} requests")
+    # Batches go to the bulk lane unless a request asks otherwise
+    batch.requests = [with_priority(request, "bulk") for request in batch.requests]
+    unknown = sorted({request.workflow_template for request in batch.requests if workflow_templates.get(request.workflow_template) is None})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown workflow templates: {', '.join(unknown)}")
+    results = await asyncio.gather(*(validate_request(request) for request in batch.requests))
+    errors = [f"Request {index}: {error}" for index, result in enumerate(results) for error in result]
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "Workflows failed validation", "errors": errors})
+    errors = [f"Request {index}: {error}" for index, request in enumerate(batch.requests) for error in check_vram(request)]
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "Requests do not fit in GPU memory", "errors": errors})
+    
+    batch_id = str(uuid.uuid4())
+    try:
+        items = await start_batch(batch.requests, batch_id)
+        return {
+            "success": True,
+            "batch_id": batch_id,
+            "items": items,
+            "message": f"Submitted {len(items)} generations"
+        }
+    except HTTPException:
+        raise  # Re-raise HTTPException as-is
+    except Exception as e:
+        logger.error(f"Error submitting batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/generate/sweep")
+async def generate_sweep(sweep: SweepRequest):
+    """Render the cartesian product of a base request and value axes as a grid"""
+    unknown = [axis for axis in sweep.axes if axis not in SWEEP_AXES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot sweep over: {', '.join(unknown)}")
+    if not sweep.axes or any(not values for values in sweep.axes.values()):
+        raise HTTPException(status_code=400, detail="Every axis needs at least one value")
+    shape = [len(values) for values in sweep.axes.values()]
+    cell_count = 1
+    for size in shape:
+        cell_count *= size
+    if cell_count > SWEEP_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"Sweep has {cell_count} cells, the limit is {SWEEP_MAX_CELLS}")
+    if workflow_templates.get(sweep.base.workflow_template) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown workflow template '{sweep.base.workflow_template}'")
+    sweep.base = with_priority(sweep.base, "bulk")
+    
+    names = list(sweep.axes)
+    cells = []
+    base = sweep.base.dict()
+    for index in itertools.product(*(range(size) for size in shape)):
+        values = {name: sweep.axes[name][position] for name, position in zip(names, index)}
+        try:
+            request = VideoGenerationRequest(**{**base, **values})
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Cell {list(index)}: {e}")
+        cells.append({"index": list(index), "values": values, "request": request})
+    
+    results = await asyncio.gather(*(validate_request(cell["request"]) for cell in cells))
+    errors = [f"Cell {cell['index']}: {error}" for cell, result in zip(cells, results) for error in result]
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "Workflows failed validation", "errors": errors})
+    errors = [f"Cell {cell['index']}: {error}" for cell in cells for error in check_vram(cell["request"])]
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "Cells do not fit in GPU memory", "errors": errors})
+    
+    # Cells sharing a checkpoint/LoRA pair are queued back to back so dispatch can keep them on one backend
+    cells.sort(key=lambda cell: (cell["request"].checkpoint, cell["request"].lora or ""))
+    sweep_id = str(uuid.uuid4())
+    try:
+        items = await start_batch([cell["request"] for cell in cells], sweep_id)
+        for cell, item in zip(cells, items):
+            del cell["request"]
+            cell["video_id"] = item["video_id"]
+        cells.sort(key=lambda cell: cell["index"])
+        await db.generation_sweeps.insert_one({
+            "id": sweep_id,
+            "axes": sweep.axes,
+            "shape": shape,
+            "cells": cells,
+            "created_at": datetime.utcnow()
+        })
+        return {
+            "success": True,
+            "sweep_id": sweep_id,
+            "batch_id": sweep_id,
+            "shape": shape,
+            "cached": sum(1 for item in items if item.get("cached")),
+            "message": f"Sweep of {len(cells)} cells started"
+        }
+    except HTTPException:
+        raise  # Re-raise HTTPException as-is
+    except Exception as e:
+        logger.error(f"Error starting sweep: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/generate/sweep/{sweep_id}")
+async def get_sweep(sweep_id: str):
+    """Sweep results laid out by axis index"""
+    sweep = await db.generation_sweeps.find_one({"id": sweep_id}, {"_id": 0})
+    if not sweep:
+        raise HTTPException(status_code=404, detail="Sweep not found")
+    generations = await db.video_generations.find(
+        {"batch_id": sweep_id},
+        {"id": 1, "status": 1, "progress": 1, "result_path": 1, "video": 1, "manifest": 1, "error_message": 1}
+    ).to_list(None)
+    by_id = {gen["id"]: gen for gen in generations}
+    for cell in sweep["cells"]:
+        gen = by_id.get(cell["video_id"]) or {}
+        cell.update({
+            "status": gen.get("status"),
+            "progress": gen.get("progress"),
+            "result_path": gen.get("result_path"),
+            "error_message": gen.get("error_message"),
+            "previews": preview_renderer.urls(gen) if gen.get("manifest") else None
+        })
+    return sweep
+
+@api_router.get("/generate/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Aggregate status and progress of a batch"""
+    generations = await db.video_generations.find(
+        {"batch_id": batch_id},
+        {"id": 1, "status": 1, "progress": 1, "comfyui_prompt_id": 1, "comfyui_backend": 1}
+    ).to_list(None)
+    if not generations:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    counts: Dict[str, int] = {}
+    progress = 0.0
+    for gen in generations:
+        counts[gen["status"]] = counts.get(gen["status"], 0) + 1
+        if gen["status"] in TERMINAL_STATUSES:
+            progress += 1.0
+            continue
+        value = gen.get("progress") or 0.0
+        state = backend_registry.get(gen.get("comfyui_backend")).listener.get_state(gen.get("comfyui_prompt_id"))
+        render = segment_renders.get(gen["id"])
+        if render is not None:
+            value = render.progress
+        elif state is not None:
+            value = state["progress"]
+        progress += value
+    return {
+        "batch_id": batch_id,
+        "total": len(generations),
+        "counts": counts,
+        "progress": progress / len(generations),
+        "done": all(gen["status"] in TERMINAL_STATUSES for gen in generations)
+    }
+
 @api_router.get("/generate/status/{video_id}")
 async def get_video_status(video_id: str):
     """Get video generation status"""
@@ -496,26 +3587,34 @@ async def get_video_status(video_id: str):
         if not video_gen:
             raise HTTPException(status_code=404, detail="Video generation not found")
         
-        # Check ComfyUI queue status if still processing
+        backend = backend_registry.get(video_gen.get("comfyui_backend"))
+        
+        # Live progress comes from the ComfyUI event feed
         if video_gen["status"] == "processing":
-            queue_status = await ComfyUIService.get_queue_status()
-            if queue_status:
-                # Check if prompt is still in queue
-                running = queue_status.get("queue_running", [])
-                pending = queue_status.get("queue_pending", [])
-                
-                prompt_id = video_gen.get("comfyui_prompt_id")
-                
-                # Check if completed
-                if not any(item[1] == prompt_id for item in running + pending):
-                    # Prompt completed, update status
-                    await db.video_generations.update_one(
-                        {"id": video_id},
-                        {"$set": {"status": "completed", "completed_at": datetime.utcnow()}}
-                    )
-                    video_gen["status"] = "completed"
+            state = backend.listener.get_state(video_gen.get("comfyui_prompt_id"))
+            if state is not None:
+                video_gen["progress"] = state["progress"]
+            render = segment_renders.get(video_id)
+            if render is not None:
+                video_gen["progress"] = render.progress
+        
+        # Fall back to polling the ComfyUI queue while the event feed is down
+        if video_gen["status"] == "processing" and video_gen.get("comfyui_prompt_id") and not backend.listener.connected:
+            if await backend.queue.get():
+                # Check if finished
+                if backend.queue.locate(video_gen.get("comfyui_prompt_id")) is None:
+                    await settle_prompt(video_gen["comfyui_prompt_id"], backend)
+                    video_gen = await db.video_generations.find_one({"id": video_id})
         
-        return VideoGeneration(**video_gen)
+        generation = VideoGeneration(**video_gen)
+        if generation.status in ("queued", "processing"):
+            generation.estimated_seconds = runtime_estimator.predict(generation.checkpoint, render_work(generation))
+            eta = dispatch_queue.eta(video_id)
+            if eta is not None:
+                generation.queue_position, generation.eta_seconds = eta["queue_position"], eta["eta_seconds"]
+            elif generation.estimated_seconds is not None:
+                generation.eta_seconds = generation.estimated_seconds * (1 - (generation.progress or 0.0))
+        return generation
         
     except HTTPException:
         raise  # Re-raise HTTPException as-is
@@ -523,21 +3622,400 @@ async def get_video_status(video_id: str):
         logger.error(f"Error getting video status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def cancel_generation(video_gen: Dict[str, Any]):
+    """Cancel a generation, interrupting its ComfyUI prompt unless others share it"""
+    video_id = video_gen["id"]
+    prompt_id = video_gen.get("comfyui_prompt_id")
+    backend_name = video_gen.get("comfyui_backend")
+    if video_gen["status"] == "queued":
+        job = dispatch_queue.withdraw(video_id)
+        if job is not None and job.prompt_id is not None:
+            # Dispatched after the record was read
+            prompt_id, backend_name = job.prompt_id, job.backend
+    backend = backend_registry.get(backend_name)
+    # A prompt shared by identical submissions keeps running for the others
+    shared = bool(prompt_id) and any(other != video_id for other in await find_active_video_ids(prompt_id))
+    if shared:
+        backend.listener.unwatch(prompt_id, video_id)
+    elif prompt_id:
+        if await backend.queue.get() is None:
+            # Without a snapshot the prompt may still be queued or running
+            raise HTTPException(status_code=503, detail=f"Queue of ComfyUI backend {backend.name} is unavailable")
+        located = backend.queue.locate(prompt_id)
+        if located is not None:
+            running = located["state"] == "running"
+            if not await ComfyUIService.cancel_prompt(prompt_id, running, backend):
+                raise HTTPException(status_code=502, detail="Failed to cancel prompt in ComfyUI")
+        dispatch_queue.release(prompt_id)
+    
+    await db.video_generations.update_one(
+        {"id": video_id},
+        {"$set": {"status": "cancelled", "completed_at": datetime.utcnow()}}
+    )
+    progress_broker.publish(video_id, {"type": "cancelled", "status": "cancelled"})
+
+async def cancel_segments(parent_id: str):
+    """Cancel the unfinished segments of a segmented generation"""
+    segments = await db.video_generations.find(
+        {"parent_id": parent_id, "status": {"$in": ["pending", "queued", "processing"]}}
+    ).to_list(None)
+    for segment in segments:
+        try:
+            await cancel_generation(segment)
+        except Exception as e:
+            logger.error(f"Error cancelling segment {segment['id']}: {e}")
+
+@api_router.post("/generate/cancel/{video_id}")
+async def cancel_video_generation(video_id: str):
+    """Cancel a generation on the ComfyUI backend it was dispatched to"""
+    try:
+        video_gen = await db.video_generations.find_one({"id": video_id})
+        
+        if not video_gen:
+            raise HTTPException(status_code=404, detail="Video generation not found")
+        if video_gen["status"] in TERMINAL_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Video generation already {video_gen['status']}")
+        
+        if video_gen.get("segment_count"):
+            # The parent is marked first so its segments' cancellations don't read as failures
+            await db.video_generations.update_one(
+                {"id": video_id},
+                {"$set": {"status": "cancelled", "completed_at": datetime.utcnow()}}
+            )
+            progress_broker.publish(video_id, {"type": "cancelled", "status": "cancelled"})
+            await cancel_segments(video_id)
+        else:
+            await cancel_generation(video_gen)
+        return {"success": True, "video_id": video_id, "status": "cancelled"}
+        
+    except HTTPException:
+        raise  # Re-raise HTTPException as-is
+    except Exception as e:
+        logger.error(f"Error cancelling video generation: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def resolve_outputs(video_gen: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Files produced for a generation, looked up from ComfyUI if not yet recorded"""
+    if video_gen.get("outputs"):
+        return video_gen["outputs"]
+    prompt_id = video_gen.get("comfyui_prompt_id")
+    if not prompt_id:
+        return []
+    backend = backend_registry.get(video_gen.get("comfyui_backend"))
+    state = backend.listener.get_state(prompt_id)
+    if state is not None and state["outputs"]:
+        outputs = state["outputs"]
+    else:
+        history = await ComfyUIService.get_history(prompt_id, backend)
+        outputs = collect_output_images(history) if history else []
+    if outputs and video_gen["status"] == "completed":
+        await db.video_generations.update_one({"id": video_gen["id"]}, {"$set": {"outputs": outputs}})
+    return outputs
+
+def artifact_response(path: Path, media_type: Optional[str] = None) -> FileResponse:
+    """Serve a stored artifact; content addressing makes it safe to cache forever"""
+    return FileResponse(
+        path,
+        media_type=media_type or mimetypes.guess_type(path.name)[0],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+@api_router.get("/artifacts/{sha256}")
+async def get_artifact(sha256: str):
+    """Serve a file from the content-addressed artifact store"""
+    path = artifact_store.get(sha256.lower())
+    if path is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return artifact_response(path)
+
+async def serve_preview(video_id: str, kind: str) -> FileResponse:
+    """Serve a generation's preview, rendering it on first use"""
+    video_gen = await db.video_generations.find_one({"id": video_id})
+    if not video_gen:
+        raise HTTPException(status_code=404, detail="Video generation not found")
+    if not video_gen.get("manifest"):
+        raise HTTPException(status_code=404, detail="Preview not available until outputs are harvested")
+    try:
+        path = await preview_renderer.get(video_gen, kind)
+    except Exception as e:
+        logger.error(f"Error rendering {kind} for {video_id}: {e}")
+        raise HTTPException(status_code=502, detail=f"Could not render {kind}")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Preview not available")
+    return artifact_response(path, "image/webp")
+
+@api_router.get("/generate/{video_id}/poster")
+async def get_generation_poster(video_id: str):
+    """Downscaled poster frame of a generation"""
+    return await serve_preview(video_id, "poster")
+
+@api_router.get("/generate/{video_id}/sprite")
+async def get_generation_sprite(video_id: str):
+    """Sprite sheet of evenly spaced frames, tiled left to right"""
+    return await serve_preview(video_id, "sprite")
+
+@api_router.get("/generate/{video_id}/frames/{n}")
+async def get_video_frame(video_id: str, n: int, request: Request):
+    """Stream a generated frame from ComfyUI without buffering it in memory"""
+    video_gen = await db.video_generations.find_one({"id": video_id})
+    if not video_gen:
+        raise HTTPException(status_code=404, detail="Video generation not found")
+    
+    # Harvested frames are served from the artifact store unless evicted
+    manifest = video_gen.get("manifest") or []
+    if 0 <= n < len(manifest):
+        path = artifact_store.get(manifest[n]["sha256"])
+        if path is not None:
+            return artifact_response(path, manifest[n].get("content_type"))
+    
+    outputs = await resolve_outputs(video_gen)
+    if n < 0 or n >= len(outputs):
+        raise HTTPException(status_code=404, detail="Frame not found")
+    
+    # Relay range and conditional headers so ComfyUI can answer 206/304 itself
+    headers = {name: request.headers[name] for name in FRAME_REQUEST_HEADERS if name in request.headers}
+    backend = backend_registry.get(video_gen.get("comfyui_backend"))
+    upstream = await ComfyUIService.open_view(outputs[n], headers, backend)
+    if upstream is None:
+        raise HTTPException(status_code=503, detail="ComfyUI backend unavailable")
+    if upstream.status not in (200, 206, 304, 416):
+        upstream.release()
+        if upstream.status == 404:
+            raise HTTPException(status_code=404, detail="Frame not found in ComfyUI")
+        raise HTTPException(status_code=502, detail=f"ComfyUI returned status {upstream.status}")
+    
+    response_headers = {name: upstream.headers[name] for name in FRAME_RESPONSE_HEADERS if name in upstream.headers}
+    
+    async def body():
+        try:
+            async for chunk in upstream.content.iter_chunked(FRAME_CHUNK_SIZE):
+                yield chunk
+        finally:
+            upstream.release()
+    
+    return StreamingResponse(body(), status_code=upstream.status, headers=response_headers)
+
+def snapshot_event(video_gen: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the initial stream event describing a generation's current state"""
+    event = {
+        "type": "snapshot",
+        "video_id": video_gen["id"],
+        "status": video_gen["status"],
+        "progress": video_gen.get("progress"),
+        "error_message": video_gen.get("error_message"),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    backend = backend_registry.get(video_gen.get("comfyui_backend"))
+    state = backend.listener.get_state(video_gen.get("comfyui_prompt_id"))
+    if video_gen["status"] == "processing" and state is not None:
+        event["progress"] = state["progress"]
+    render = segment_renders.get(video_gen["id"])
+    if video_gen["status"] == "processing" and render is not None:
+        event["progress"] = render.progress
+    return event
+
+@api_router.get("/generate/stream/{video_id}")
+async def stream_video_status(video_id: str, request: Request):
+    """Stream generation status and progress as Server-Sent Events"""
+    read_at = datetime.utcnow()
+    video_gen = await db.video_generations.find_one({"id": video_id})
+    if not video_gen:
+        raise HTTPException(status_code=404, detail="Video generation not found")
+    
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    progress_broker.subscribe(video_id, queue, since=read_at)
+    
+    async def event_stream():
+        try:
+            snapshot = snapshot_event(video_gen)
+            yield f"event: snapshot\ndata: {json.dumps(snapshot, default=str)}\n\n"
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+                if event.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            progress_broker.unsubscribe(video_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.websocket("/ws")
+async def progress_websocket(websocket: WebSocket):
+    """Multiplexed progress feed.
+
+    Clients send {"action": "subscribe" | "unsubscribe", "video_id": ...} and
+    receive the events of every generation they are subscribed to.
+    """
+    await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    subscriptions: Set[str] = set()
+    
+    async def receive_commands():
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (WebSocketDisconnect, ValueError):
+                return
+            video_id = message.get("video_id")
+            if not video_id:
+                continue
+            if message.get("action") == "subscribe" and video_id not in subscriptions:
+                read_at = datetime.utcnow()
+                video_gen = await db.video_generations.find_one({"id": video_id})
+                if not video_gen:
+                    await queue.put({"type": "error", "video_id": video_id, "message": "Video generation not found"})
+                    continue
+                subscriptions.add(video_id)
+                await queue.put(snapshot_event(video_gen))
+                progress_broker.subscribe(video_id, queue, since=read_at)
+            elif message.get("action") == "unsubscribe" and video_id in subscriptions:
+                subscriptions.discard(video_id)
+                progress_broker.unsubscribe(video_id, queue)
+    
+    receiver = asyncio.create_task(receive_commands())
+    try:
+        while not receiver.done():
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                await websocket.send_text(json.dumps(getter.result(), default=str))
+            else:
+                getter.cancel()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in progress websocket: {e}")
+    finally:
+        receiver.cancel()
+        for video_id in subscriptions:
+            progress_broker.unsubscribe(video_id, queue)
+
+def encode_history_cursor(gen: Dict[str, Any]) -> str:
+    """Opaque cursor pointing after a history item"""
+    position = orjson.dumps([gen["created_at"].isoformat(), gen["id"]])
+    return base64.urlsafe_b64encode(position).decode().rstrip("=")
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """(created_at, id) of the item a cursor points after"""
+    try:
+        created_at, video_id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), str(video_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def history_query(status: Optional[str] = None, checkpoint: Optional[str] = None, lora: Optional[str] = None,
+                  created_after: Optional[datetime] = None, created_before: Optional[datetime] = None,
+                  cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Filter selecting the history items matching the filters that come after the cursor"""
+    # Segments are listed through their parent only
+    query: Dict[str, Any] = {"parent_id": None}
+    if status:
+        query["status"] = {"$in": [value.strip() for value in status.split(",") if value.strip()]}
+    if checkpoint:
+        query["checkpoint"] = checkpoint
+    if lora:
+        query["lora"] = lora
+    if created_after or created_before:
+        query["created_at"] = {}
+        if created_after:
+            query["created_at"]["$gte"] = created_after
+        if created_before:
+            query["created_at"]["$lt"] = created_before
+    if cursor:
+        created_at, video_id = decode_history_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": video_id}}
+        ]
+    return query
+
+# Fields of a history item that are computed rather than stored
+HISTORY_LIVE_FIELDS = {"previews", "queue_position", "eta_seconds"}
+
 @api_router.get("/generate/history")
-async def get_generation_history():
-    """Get generation history"""
+async def get_generation_history(
+    cursor: Optional[str] = None,
+    limit: int = HISTORY_PAGE_SIZE,
+    status: Optional[str] = None,
+    checkpoint: Optional[str] = None,
+    lora: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = None
+):
+    """Get a page of generation history, newest first
+
+    Pages are keyset-paginated on (created_at, id): pass the returned next_cursor
+    to get the following page. status takes a comma separated list, and fields a
+    comma separated list of fields to return instead of the whole record.
+    """
+    known = set(VideoGeneration.__fields__)
+    requested = known
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - known
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        # The cursor is built from these
+        requested |= {"id", "created_at"}
+    projection = {field: 1 for field in requested - HISTORY_LIVE_FIELDS}
+    projection["_id"] = 0
+    if "previews" in requested and "manifest" not in requested:
+        # Previews only need the frame count, not the full manifest
+        projection["manifest.url"] = 1
+
+    query = history_query(status, checkpoint, lora, created_after, created_before, cursor)
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+
     try:
-        generations = await db.video_generations.find().sort("created_at", -1).limit(50).to_list(50)
-        return [VideoGeneration(**gen) for gen in generations]
+        generations = await db.video_generations.find(query, projection).sort(
+            [("created_at", -1), ("id", -1)]
+        ).limit(limit + 1).to_list(limit + 1)
     except Exception as e:
         logger.error(f"Error getting generation history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    next_cursor = encode_history_cursor(generations[limit - 1]) if len(generations) > limit else None
+    items = []
+    for gen in generations[:limit]:
+        if "previews" in requested:
+            gen["previews"] = preview_renderer.urls(gen)
+            if "manifest" not in requested:
+                gen.pop("manifest", None)
+        items.append(gen)
+    return {"items": items, "next_cursor": next_cursor}
+
 @api_router.get("/comfyui/queue")
 async def get_queue():
-    """Get ComfyUI queue status"""
-    queue_status = await ComfyUIService.get_queue_status()
-    return queue_status or {"queue_running": [], "queue_pending": []}
+    """Get ComfyUI queue status across every backend"""
+    backends = backend_registry.all()
+    snapshots = await asyncio.gather(*(backend.queue.get() for backend in backends))
+    queue_status = {"queue_running": [], "queue_pending": [], "backends": {}}
+    for backend, snapshot in zip(backends, snapshots):
+        snapshot = snapshot or {"queue_running": [], "queue_pending": []}
+        queue_status["queue_running"].extend(snapshot.get("queue_running", []))
+        queue_status["queue_pending"].extend(snapshot.get("queue_pending", []))
+        queue_status["backends"][backend.name] = snapshot
+    return queue_status
+
+@api_router.get("/db/indexes")
+async def get_database_indexes():
+    """Verify the MongoDB indexes against the expected set and report drift"""
+    try:
+        return await index_manager.verify()
+    except Exception as e:
+        logger.error(f"Error verifying indexes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 # Original status routes
 @api_router.post("/status", response_model=StatusCheck)
@@ -253,8 +253,8 @@ class BackendTester:
             response = self.session.get(f"{API_BASE}/generate/history")
             if response.status_code == 200:
                 data = response.json()
-                if isinstance(data, list):
-                    self.log_test("Generation History", True, f"History retrieved ({len(data)} records)")
+                if isinstance(data, dict) and isinstance(data.get("items"), list):
+                    self.log_test("Generation History", True, f"History retrieved ({len(data['items'])} records)")
                     return True
                 else:
                     self.log_test("Generation History", False, "Invalid response format", data)
@@ -40,7 +40,7 @@ def test_video_generation_debug():
     response = requests.get(f"{API_BASE}/generate/history")
     print(f"Status Code: {response.status_code}")
     if response.status_code == 200:
-        data = response.json()
+        data = response.json()["items"]
         print(f"History records: {len(data)}")
         if data:
             print("Latest record:")
@@ -4,6 +4,8 @@ import axios from "axios";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Fields the history list renders; the rest of each record is not fetched
+const HISTORY_FIELDS = "id,prompt,checkpoint,lora,status,created_at,video,previews";
 
 const VideoGenerator = () => {
   const [checkpoints, setCheckpoints] = useState([]);
@@ -19,6 +21,8 @@ const VideoGenerator = () => {
   });
   const [isGenerating, setIsGenerating] = useState(false);
   const [generationHistory, setGenerationHistory] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [isLoadingHistory, setIsLoadingHistory] = useState(false);
   const [comfyuiStatus, setComfyuiStatus] = useState("checking");
   const [currentGeneration, setCurrentGeneration] = useState(null);
   const [comfyuiUrl, setComfyuiUrl] = useState("http://127.0.0.1:8188");
@@ -91,10 +95,36 @@ const VideoGenerator = () => {
 
   const loadGenerationHistory = async () => {
     try {
-      const response = await axios.get(`${API}/generate/history`);
-      setGenerationHistory(response.data || []);
+      const response = await axios.get(`${API}/generate/history`, {
+        params: { fields: HISTORY_FIELDS }
+      });
+      setGenerationHistory(response.data.items || []);
+      setHistoryCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error("Error loading generation history:", error);
+    }
+  };
+
+  const loadMoreHistory = async () => {
+    if (!historyCursor || isLoadingHistory) return;
+    setIsLoadingHistory(true);
+    try {
+      const response = await axios.get(`${API}/generate/history`, {
+        params: { fields: HISTORY_FIELDS, cursor: historyCursor }
+      });
+      setGenerationHistory(prev => [...prev, ...(response.data.items || [])]);
+      setHistoryCursor(response.data.next_cursor);
     } catch (error) {
       console.error("Error loading generation history:", error);
+    } finally {
+      setIsLoadingHistory(false);
+    }
+  };
+
+  const handleHistoryScroll = (e) => {
+    const { scrollTop, scrollHeight, clientHeight } = e.target;
+    if (scrollHeight - scrollTop - clientHeight < 200) {
+      loadMoreHistory();
     }
   };
 
@@ -145,20 +175,60 @@ const VideoGenerator = () => {
         const videoId = response.data.video_id;
         setCurrentGeneration({
           id: videoId,
-          status: "processing",
+          status: response.data.status || "processing",
           prompt: formData.prompt
         });
         
-        // Poll for status updates
-        pollGenerationStatus(videoId);
+        // Stream status updates
+        streamGenerationStatus(videoId);
       }
     } catch (error) {
       console.error("Error generating video:", error);
       setIsGenerating(false);
-      alert("Error generating video: " + (error.response?.data?.detail || error.message));
+      const detail = error.response?.data?.detail;
+      let message = detail?.errors ? `${detail.message}:\n${detail.errors.join("\n")}` : detail;
+      const retryAfter = error.response?.headers?.["retry-after"];
+      if (error.response?.status === 429 && retryAfter) {
+        message = `${message}. Retry in ${retryAfter}s`;
+      }
+      alert("Error generating video: " + (message || error.message));
     }
   };
 
+  const streamGenerationStatus = (videoId) => {
+    if (typeof EventSource === "undefined") {
+      pollGenerationStatus(videoId);
+      return;
+    }
+
+    const source = new EventSource(`${API}/generate/stream/${videoId}`);
+    const handleEvent = async (message) => {
+      const event = JSON.parse(message.data);
+      setCurrentGeneration(prev => ({
+        ...prev,
+        status: event.status,
+        progress: event.progress ?? prev?.progress,
+        error_message: event.error_message ?? prev?.error_message
+      }));
+
+      if (["completed", "failed", "cancelled"].includes(event.status)) {
+        source.close();
+        setIsGenerating(false);
+        await loadGenerationHistory();
+      }
+    };
+
+    ["snapshot", "status", "progress", "completed", "failed", "cancelled"].forEach(type =>
+      source.addEventListener(type, handleEvent)
+    );
+    source.onerror = () => {
+      // Fall back to polling if the stream cannot be established
+      if (source.readyState === EventSource.CLOSED) {
+        pollGenerationStatus(videoId);
+      }
+    };
+  };
+
   const pollGenerationStatus = async (videoId) => {
     try {
       const response = await axios.get(`${API}/generate/status/${videoId}`);
@@ -166,10 +236,10 @@ const VideoGenerator = () => {
       
       setCurrentGeneration(generation);
       
-      if (generation.status === "completed" || generation.status === "failed") {
+      if (["completed", "failed", "cancelled"].includes(generation.status)) {
         setIsGenerating(false);
         await loadGenerationHistory();
-      } else if (generation.status === "processing") {
+      } else if (["queued", "processing"].includes(generation.status)) {
         // Continue polling
         setTimeout(() => pollGenerationStatus(videoId), 3000);
       }
@@ -200,6 +270,8 @@ const VideoGenerator = () => {
         return "text-red-500";
       case "processing":
         return "text-yellow-500";
+      case "queued":
+        return "text-blue-400";
       default:
         return "text-gray-500";
     }
@@ -444,7 +516,20 @@ const VideoGenerator = () => {
                   <div className="text-sm text-gray-300">
                     <strong>Prompt:</strong> {currentGeneration.prompt}
                   </div>
-                  {currentGeneration.status === "processing" && (
+                  {currentGeneration.status === "processing" && currentGeneration.progress != null && (
+                    <div className="mt-4">
+                      <div className="w-full bg-gray-700 rounded-full h-2">
+                        <div
+                          className="bg-purple-500 h-2 rounded-full transition-all"
+                          style={{ width: `${Math.round(currentGeneration.progress * 100)}%` }}
+                        ></div>
+                      </div>
+                      <div className="text-xs text-gray-400 mt-1 text-right">
+                        {Math.round(currentGeneration.progress * 100)}%
+                      </div>
+                    </div>
+                  )}
+                  {currentGeneration.status === "processing" && currentGeneration.progress == null && (
                     <div className="mt-4">
                       <div className="animate-pulse flex space-x-4">
                         <div className="rounded-full bg-purple-500 h-3 w-3"></div>
@@ -462,13 +547,21 @@ const VideoGenerator = () => {
             {/* Generation History */}
             <div className="bg-gray-800 rounded-xl p-6 shadow-2xl">
               <h3 className="text-xl font-bold mb-4 text-purple-300">Storico Generazioni</h3>
-              <div className="space-y-3 max-h-96 overflow-y-auto">
+              <div className="space-y-3 max-h-96 overflow-y-auto" onScroll={handleHistoryScroll}>
                 {generationHistory.length === 0 ? (
                   <p className="text-gray-400 text-center py-4">Nessuna generazione ancora</p>
                 ) : (
-                  generationHistory.map((generation, index) => (
-                    <div key={index} className="bg-gray-700 rounded-lg p-4">
+                  generationHistory.map((generation) => (
+                    <div key={generation.id} className="bg-gray-700 rounded-lg p-4">
                       <div className="flex justify-between items-start mb-2">
+                        {generation.previews && (
+                          <img
+                            src={`${BACKEND_URL}${generation.previews.poster}`}
+                            alt=""
+                            loading="lazy"
+                            className="w-16 h-16 object-cover rounded mr-3"
+                          />
+                        )}
                         <div className="flex-1">
                           <div className="text-sm text-gray-300 truncate">
                             {generation.prompt}
@@ -491,9 +584,28 @@ const VideoGenerator = () => {
                           minute: "2-digit"
                         })}
                       </div>
+                      {generation.video && (
+                        <a
+                          href={`${BACKEND_URL}${generation.video.url}`}
+                          target="_blank"
+                          rel="noopener noreferrer"
+                          className="inline-block mt-2 text-xs text-purple-300 hover:text-purple-200"
+                        >
+                          Scarica video ({generation.video.format})
+                        </a>
+                      )}
                     </div>
                   ))
                 )}
+                {historyCursor && (
+                  <button
+                    onClick={loadMoreHistory}
+                    disabled={isLoadingHistory}
+                    className="w-full py-2 text-xs text-purple-300 hover:text-purple-200 disabled:text-gray-500"
+                  >
+                    {isLoadingHistory ? "Caricamento..." : "Carica altre"}
+                  </button>
+                )}
               </div>
             </div>
           </div>
@@ -0,0 +1,114 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+import server
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return server.CircuitBreaker("gpu", failure_threshold=3, reset_timeout=30)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+
+def test_successful_trial_closes(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_only_server_errors_count(breaker):
+    for _ in range(3):
+        breaker.record_response(404)
+    assert breaker.state == "closed"
+    for _ in range(3):
+        breaker.record_response(503)
+    assert breaker.state == "open"
+
+
+def test_only_connection_errors_count(breaker):
+    for _ in range(3):
+        breaker.record_error(ValueError("bad payload"))
+    assert breaker.state == "closed"
+    breaker.record_error(aiohttp.ClientConnectionError())
+    breaker.record_error(asyncio.TimeoutError())
+    breaker.record_error(aiohttp.ClientConnectionError())
+    assert breaker.state == "open"
+
+
+def test_reset_closes(breaker):
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.reset()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_ready_does_not_start_the_trial(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    assert not breaker.ready()
+    clock.now += 30
+    assert breaker.ready() and breaker.ready()
+    assert breaker.allow()
+    assert not breaker.ready()
+    assert breaker.state == "half_open"
@@ -0,0 +1,109 @@
+import pytest
+
+import server
+
+WORKFLOW = b'{"4": {"inputs": {"ckpt_name": "a"}, "class_type": "CheckpointLoaderSimple"}}'
+
+
+def make_backend(host, models=None, vram_capacity=None):
+    backend = server.ComfyUIBackend(f"http://{host}:8188")
+    backend.lane.models = models
+    backend.vram_capacity = vram_capacity
+    return backend
+
+
+def make_job(queue, key, checkpoint, priority="normal", work=1.0, vram=0):
+    job = server.DispatchJob(key, WORKFLOW, checkpoint, None, priority, work, vram)
+    job.video_ids.append(key)
+    queue._insert(job)
+    return job
+
+
+def drain(queue, backend):
+    """Keys in the order _next hands the pending jobs to one backend"""
+    order = []
+    while queue.pending:
+        job, _ = queue._next([backend], [backend])
+        queue.pending.remove(job)
+        order.append(job.key)
+    return order
+
+
+@pytest.fixture
+def queue():
+    return server.DispatchQueue()
+
+
+def test_higher_priority_lane_goes_first(queue):
+    backend = make_backend("gpu")
+    make_job(queue, "bulk", "a", priority="bulk")
+    make_job(queue, "normal", "a")
+    make_job(queue, "high", "a", priority="high")
+    assert drain(queue, backend) == ["high", "normal", "bulk"]
+
+
+def test_loaded_models_pull_a_job_forward(queue):
+    backend = make_backend("gpu", models=("b", None))
+    make_job(queue, "first", "a")
+    make_job(queue, "matching", "b")
+    job, chosen = queue._next([backend], [backend])
+    assert (job.key, chosen) == ("matching", backend)
+
+
+def test_affinity_stays_inside_the_priority_lane(queue):
+    backend = make_backend("gpu", models=("b", None))
+    make_job(queue, "matching", "b", priority="bulk")
+    make_job(queue, "other", "a")
+    job, _ = queue._next([backend], [backend])
+    assert job.key == "other"
+
+
+def test_job_skipped_too_often_goes_first(queue):
+    backend = make_backend("gpu", models=("b", None))
+    first = make_job(queue, "first", "a")
+    make_job(queue, "matching", "b")
+    first.skips = server.DISPATCH_MAX_SKIPS
+    job, _ = queue._next([backend], [backend])
+    assert job is first
+
+
+def test_job_waiting_past_the_budget_goes_first(queue):
+    backend = make_backend("gpu", models=("b", None))
+    first = make_job(queue, "first", "a")
+    make_job(queue, "matching", "b")
+    first.enqueued_at -= queue.budget() + 1
+    job, _ = queue._next([backend], [backend])
+    assert job is first
+
+
+def test_shortest_estimated_job_first(queue, monkeypatch):
+    # Unestimated jobs keep arrival order behind the estimated ones
+    monkeypatch.setattr(server.runtime_estimator, "predict", lambda checkpoint, work: None if checkpoint == "new" else work)
+    backend = make_backend("gpu")
+    make_job(queue, "unknown", "new", work=1.0)
+    make_job(queue, "long", "a", work=10.0)
+    make_job(queue, "short", "a", work=2.0)
+    make_job(queue, "medium", "a", work=4.0)
+    assert drain(queue, backend) == ["short", "medium", "long", "unknown"]
+
+
+def test_job_goes_to_a_backend_with_room_in_vram(queue):
+    small = make_backend("small", vram_capacity=8 * server.GIB)
+    large = make_backend("large", vram_capacity=24 * server.GIB)
+    make_job(queue, "large_job", "a", vram=16 * server.GIB)
+    job, backend = queue._next([small, large], [small, large])
+    assert (job.key, backend) == ("large_job", large)
+
+
+def test_job_waits_for_a_busy_backend_with_room(queue):
+    small = make_backend("small", vram_capacity=8 * server.GIB)
+    large = make_backend("large", vram_capacity=24 * server.GIB)
+    make_job(queue, "large_job", "a", vram=16 * server.GIB)
+    assert queue._next([small], [small, large]) is None
+
+
+def test_job_too_large_for_every_backend_is_not_stuck(queue):
+    small = make_backend("small", vram_capacity=8 * server.GIB)
+    make_job(queue, "huge", "a", vram=64 * server.GIB)
+    job, backend = queue._next([small], [small])
+    assert (job.key, backend) == ("huge", small)
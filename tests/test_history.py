@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from fastapi import HTTPException
+
+import server
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().db.video_generations
+    # Pairs of generations share a created_at, so pages must break ties on id
+    collection.insert_many([
+        {
+            "id": f"v{index:02d}",
+            "created_at": START + timedelta(minutes=index // 2),
+            "status": "failed" if index % 3 == 0 else "completed",
+            "checkpoint": "a" if index % 2 else "b",
+            "parent_id": None
+        }
+        for index in range(11)
+    ])
+    collection.insert_one({"id": "segment", "created_at": START, "status": "completed", "parent_id": "v00"})
+    return collection
+
+
+def page(collection, limit, **filters):
+    """One history page the way the endpoint reads it"""
+    generations = list(
+        collection.find(server.history_query(**filters), {"_id": 0})
+        .sort([("created_at", -1), ("id", -1)])
+        .limit(limit + 1)
+    )
+    next_cursor = server.encode_history_cursor(generations[limit - 1]) if len(generations) > limit else None
+    return [gen["id"] for gen in generations[:limit]], next_cursor
+
+
+def test_cursor_round_trip():
+    gen = {"id": "4f1c0b8e", "created_at": datetime(2026, 3, 14, 15, 9, 26, 535000)}
+    cursor = server.encode_history_cursor(gen)
+    assert "=" not in cursor and "4f1c0b8e" not in cursor
+    assert server.decode_history_cursor(cursor) == (gen["created_at"], gen["id"])
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30", ""])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        server.decode_history_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_cursor_breaks_ties_on_id(collection):
+    # v05 shares its created_at with v04, which must still follow it
+    cursor = server.encode_history_cursor({"id": "v05", "created_at": START + timedelta(minutes=2)})
+    ids, _ = page(collection, 3, cursor=cursor)
+    assert ids == ["v04", "v03", "v02"]
+
+
+def test_pages_cover_every_item_once(collection):
+    seen, cursor = [], None
+    while True:
+        ids, cursor = page(collection, 2, cursor=cursor)
+        seen.extend(ids)
+        if cursor is None:
+            break
+    assert seen == [f"v{index:02d}" for index in reversed(range(11))]
+
+
+def test_filters_apply_across_pages(collection):
+    ids, cursor = page(collection, 2, status="failed", checkpoint="b")
+    assert ids == ["v06", "v00"]
+    assert cursor is None
+    ids, _ = page(collection, 10, status="failed,completed", created_after=START + timedelta(minutes=1), created_before=START + timedelta(minutes=3))
+    assert ids == ["v05", "v04", "v03", "v02"]
@@ -0,0 +1,186 @@
+import asyncio
+
+import orjson
+import pytest
+
+import server
+
+
+@pytest.fixture(scope="module", autouse=True)
+def templates():
+    server.workflow_templates.load()
+
+
+def legacy_workflow(request):
+    """The workflow create_video_workflow built before it was template-driven"""
+    if request.duration_type == "short":
+        frames = min(request.frames, 30)
+    elif request.duration_type == "medium":
+        frames = min(request.frames, 120)
+    else:
+        frames = min(request.frames, 600)
+    workflow = {
+        "3": {
+            "inputs": {
+                "seed": 156680208700286,
+                "steps": 20,
+                "cfg": 8.0,
+                "sampler_name": "euler",
+                "scheduler": "normal",
+                "denoise": 1.0,
+                "model": ["4", 0],
+                "positive": ["6", 0],
+                "negative": ["7", 0],
+                "latent_image": ["5", 0]
+            },
+            "class_type": "KSampler",
+            "_meta": {"title": "KSampler"}
+        },
+        "4": {
+            "inputs": {"ckpt_name": request.checkpoint},
+            "class_type": "CheckpointLoaderSimple",
+            "_meta": {"title": "Load Checkpoint"}
+        },
+        "5": {
+            "inputs": {"width": request.width, "height": request.height, "batch_size": frames},
+            "class_type": "EmptyLatentImage",
+            "_meta": {"title": "Empty Latent Image"}
+        },
+        "6": {
+            "inputs": {"text": request.prompt, "clip": ["4", 1]},
+            "class_type": "CLIPTextEncode",
+            "_meta": {"title": "CLIP Text Encode (Prompt)"}
+        },
+        "7": {
+            "inputs": {"text": "blurry, low quality, distorted", "clip": ["4", 1]},
+            "class_type": "CLIPTextEncode",
+            "_meta": {"title": "CLIP Text Encode (Negative)"}
+        },
+        "8": {
+            "inputs": {"samples": ["3", 0], "vae": ["4", 2]},
+            "class_type": "VAEDecode",
+            "_meta": {"title": "VAE Decode"}
+        },
+        "9": {
+            "inputs": {"filename_prefix": "ComfyUI_video", "images": ["8", 0]},
+            "class_type": "SaveImage",
+            "_meta": {"title": "Save Image"}
+        }
+    }
+    if request.lora:
+        workflow["10"] = {
+            "inputs": {
+                "lora_name": request.lora,
+                "strength_model": 1.0,
+                "strength_clip": 1.0,
+                "model": ["4", 0],
+                "clip": ["4", 1]
+            },
+            "class_type": "LoraLoader",
+            "_meta": {"title": "Load LoRA"}
+        }
+        workflow["3"]["inputs"]["model"] = ["10", 0]
+        workflow["6"]["inputs"]["clip"] = ["10", 1]
+        workflow["7"]["inputs"]["clip"] = ["10", 1]
+    return workflow
+
+
+def render(request):
+    return asyncio.run(server.ComfyUIService.create_video_workflow(request))
+
+
+@pytest.mark.parametrize("fields", [
+    {},
+    {"lora": "detail.safetensors"},
+    {"width": 768, "height": 432, "frames": 40},
+    {"duration_type": "medium", "frames": 200},
+    {"duration_type": "long", "frames": 90, "lora": "style.safetensors"},
+])
+def test_template_matches_legacy_workflow(fields):
+    request = server.VideoGenerationRequest(prompt="a cat surfing", checkpoint="sd15.safetensors", **fields)
+    assert orjson.loads(render(request)) == legacy_workflow(request)
+
+
+def test_template_without_lora_block_rejects_lora():
+    template = server.workflow_templates.get("video")
+    lora, template.lora = template.lora, None
+    try:
+        with pytest.raises(ValueError):
+            template.render({"prompt": "p", "checkpoint": "c"}, [("detail.safetensors", 1.0)])
+    finally:
+        template.lora = lora
+
+
+def test_template_hash_matches_legacy_workflow():
+    request = server.VideoGenerationRequest(prompt="a cat surfing", checkpoint="sd15.safetensors", lora="detail.safetensors")
+    assert server.workflow_hash(render(request)) == server.workflow_hash(legacy_workflow(request))
+
+
+def test_hash_ignores_key_order_and_meta():
+    workflow = legacy_workflow(server.VideoGenerationRequest(prompt="p", checkpoint="c"))
+    reordered = {node_id: dict(reversed(list(node.items()))) for node_id, node in reversed(list(workflow.items()))}
+    for node in reordered.values():
+        node["_meta"] = {"title": "renamed"}
+    assert server.workflow_hash(reordered) == server.workflow_hash(workflow)
+    assert server.workflow_hash(orjson.dumps(workflow)) == server.workflow_hash(workflow)
+
+
+def test_hash_changes_with_inputs():
+    first = server.VideoGenerationRequest(prompt="p", checkpoint="c")
+    second = server.VideoGenerationRequest(prompt="p", checkpoint="c", seed=1)
+    assert server.workflow_hash(render(first)) != server.workflow_hash(render(second))
+
+
+OBJECT_INFO = {
+    "CheckpointLoaderSimple": {"input": {"required": {"ckpt_name": [["sd15.safetensors"]]}}},
+    "KSampler": {"input": {"required": {
+        "model": ["MODEL"],
+        "seed": ["INT", {"min": 0, "max": 2 ** 64 - 1}],
+        "steps": ["INT", {"min": 1, "max": 10000}],
+        "cfg": ["FLOAT", {"min": 0.0, "max": 100.0}],
+        "sampler_name": [["euler", "ddim"]],
+        "scheduler": ["COMBO", {"options": ["normal", "karras"]}]
+    }, "optional": {"denoise": ["FLOAT", {"min": 0.0, "max": 1.0}]}}}
+}
+
+
+def sampler_workflow(**inputs):
+    return {
+        "4": {"inputs": {"ckpt_name": "sd15.safetensors"}, "class_type": "CheckpointLoaderSimple"},
+        "3": {"inputs": {
+            "model": ["4", 0], "seed": 1, "steps": 20, "cfg": 8.0,
+            "sampler_name": "euler", "scheduler": "normal", **inputs
+        }, "class_type": "KSampler"}
+    }
+
+
+def test_valid_workflow_has_no_errors():
+    assert server.validate_workflow(sampler_workflow(denoise=0.5), OBJECT_INFO) == []
+
+
+def test_unknown_node_class():
+    workflow = {**sampler_workflow(), "9": {"inputs": {}, "class_type": "SaveAnimatedWEBP"}}
+    assert server.validate_workflow(workflow, OBJECT_INFO) == ["Node 9: unknown node class 'SaveAnimatedWEBP'"]
+
+
+def test_missing_required_input():
+    workflow = sampler_workflow()
+    del workflow["3"]["inputs"]["steps"]
+    assert server.validate_workflow(workflow, OBJECT_INFO) == ["Node 3 (KSampler): missing required input 'steps'"]
+
+
+def test_link_to_missing_node():
+    errors = server.validate_workflow(sampler_workflow(model=["10", 0]), OBJECT_INFO)
+    assert errors == ["Node 3 (KSampler): 'model' links to missing node 10"]
+
+
+@pytest.mark.parametrize("inputs, message", [
+    ({"sampler_name": "dpmpp"}, "'sampler_name' value 'dpmpp' is not one of the 2 allowed values"),
+    ({"scheduler": "exponential"}, "'scheduler' value 'exponential' is not one of the 2 allowed values"),
+    ({"steps": 0}, "'steps' value 0 is below the minimum 1"),
+    ({"denoise": 1.5}, "'denoise' value 1.5 is above the maximum 1.0"),
+    ({"steps": 2.5}, "'steps' must be INT, got 2.5"),
+    ({"seed": True}, "'seed' must be INT, got True"),
+])
+def test_invalid_literal_inputs(inputs, message):
+    assert server.validate_workflow(sampler_workflow(**inputs), OBJECT_INFO) == [f"Node 3 (KSampler): {message}"]
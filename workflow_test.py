@@ -50,7 +50,7 @@ def test_complete_workflow():
         print("\n2. Checking generation history for database record...")
         response = requests.get(f"{API_BASE}/generate/history")
         if response.status_code == 200:
-            data = response.json()
+            data = response.json()["items"]
             print(f"   Total records: {len(data)}")
             
             # Find our record